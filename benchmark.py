@@ -0,0 +1,313 @@
+"""
+Benchmark code
+
+Measures the time per call of the checkers and of the decorators, compared with the undecorated function.
+
+run with:
+    python benchmark.py                                  # print the results
+    python benchmark.py --output results.json            # store the results as JSON
+    python benchmark.py --compare results.json --threshold 10  # fail if a case is more than 10% slower
+    python benchmark.py --filter deep                    # only run the cases containing 'deep'
+    python benchmark.py --filter import                  # the import time, in a new interpreter
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import typing
+from array import array
+from typing import Union, Optional, List, Dict, Iterable, Tuple
+
+import runtime_check
+from runtime_check import check_type_at_run, TypeChecker, check_bound_at_run, BoundChecker, enforce_annotations, \
+    TypedList, Schema
+from runtime_check.parallel import Parallel
+
+REPEAT = 5
+MIN_TIME = 0.05
+DEEP_SIZES = [10, 1000, 100000, 1000000]
+
+
+def _plain(val_a, val_b=1):
+    return val_a
+
+
+@check_type_at_run
+def _type_checked(val_a: Union[int, float], val_b: int = 1):
+    return val_a
+
+
+@check_type_at_run(rate=0.01)
+def _type_sampled(val_a: Union[int, float], val_b: int = 1):
+    return val_a
+
+
+@check_bound_at_run
+def _bound_checked(val_a: (0, 1), val_b: (0, 10) = 1):
+    return val_a
+
+
+@enforce_annotations
+def _enforced(val_a: [BoundChecker[(0, 1)], TypeChecker[int, float]], val_b: TypeChecker[int] = 1):
+    return val_a
+
+
+def _call(check, val):
+    """
+    Returns a benchmarked function, running check on val.
+
+    :param check: (callable) the checker
+    :param val: (Any) the checked value
+    :return: (callable)
+    """
+    return lambda: check(val)
+
+
+def _deep(check, val):
+    """
+    Returns a benchmarked function, running check on val in DEEP mode.
+
+    :param check: (callable) the checker
+    :param val: (Any) the checked value
+    :return: (callable)
+    """
+    def run():
+        runtime_check.check_type.DEEP = True
+        try:
+            check(val)
+        finally:
+            runtime_check.check_type.DEEP = False
+    return run
+
+
+def _parallel(check, val):
+    """
+    Returns a benchmarked function, running check on val in DEEP mode, with the parallel checks enabled.
+
+    :param check: (callable) the checker
+    :param val: (Any) the checked value
+    :return: (callable)
+    """
+    deep_check = _deep(check, val)
+    parallel = Parallel()
+
+    def run():
+        runtime_check.parallel.PARALLEL = parallel
+        try:
+            deep_check()
+        finally:
+            runtime_check.parallel.PARALLEL = None
+    return run
+
+
+def _reported(func):
+    """
+    Returns a benchmarked function, running func with the failed checks reported to a handler that does nothing.
+
+    :param func: (callable) the benchmarked function, whose checks fail
+    :return: (callable)
+    """
+    def run():
+        runtime_check.violations.HANDLER = _ignore
+        try:
+            func()
+        finally:
+            runtime_check.violations.HANDLER = None
+    return run
+
+
+def _ignore(violation):
+    """
+    Handler of the failed checks that does nothing.
+    """
+    pass
+
+
+def _random(size):
+    """
+    :param size: (int) the number of values
+    :return: (numpy.ndarray) random values in [0, 1[, numpy is imported here so the other cases run without it
+    """
+    import numpy
+    return numpy.random.rand(size)
+
+
+def _plugin():
+    """
+    :return: (callable, Any) the checker of a protocol, and a value of a class that implements it
+    """
+    class Plugin(typing.Protocol):
+        def load(self):
+            pass
+
+        def close(self):
+            pass
+
+    class File(object):
+        def load(self):
+            pass
+
+        def close(self):
+            pass
+    return TypeChecker[Plugin], File()
+
+
+def _table(size):
+    """
+    :param size: (int) the number of rows
+    :return: ({str: numpy.ndarray}) a batch of three columns, numpy is imported here
+    """
+    import numpy
+    return {'id': numpy.arange(size), 'score': numpy.random.rand(size), 'age': numpy.full(size, 30, dtype=numpy.int32)}
+
+
+def _import(module):
+    """
+    Returns a benchmarked function, importing module in a new interpreter.
+
+    :param module: (str) the imported module, None for the startup of the interpreter only
+    :return: (callable)
+    """
+    command = [sys.executable, "-c", "import {}".format(module) if module else "pass"]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.check_call(command, cwd=directory)
+
+
+def _cases():
+    """
+    Returns the benchmarked cases, built lazily so the large inputs are only created when needed.
+
+    :return: ([(str, callable)]) the name of the cases, and functions returning the benchmarked function
+    """
+    cases = [
+        ("type/scalar", lambda: _call(TypeChecker[int], 1)),
+        ("type/union", lambda: _call(TypeChecker[int, float, str], 1.0)),
+        ("type/optional", lambda: _call(TypeChecker[Optional[int]], None)),
+        ("type/nested", lambda: _call(TypeChecker[Dict[str, List[Optional[int]]]], {"a": [1, None]})),
+        ("bound/single", lambda: _call(BoundChecker[(0, 1)], 0.5)),
+        ("bound/disjoint", lambda: _call(BoundChecker[[(i, i + 0.5) for i in range(0, 20, 2)]], 10.2)),
+        ("bound/preset", lambda: _call(BoundChecker.probability, 0.5)),
+        ("decorator/undecorated", lambda: lambda: _plain(0.5, val_b=2)),
+        ("decorator/check_type_at_run", lambda: lambda: _type_checked(0.5, val_b=2)),
+        ("decorator/check_type_at_run/rate", lambda: lambda: _type_sampled(0.5, val_b=2)),
+        ("decorator/check_type_at_run/reported", lambda: _reported(lambda: _type_checked('', val_b=2))),
+        ("decorator/check_bound_at_run", lambda: lambda: _bound_checked(0.5, val_b=2)),
+        ("decorator/enforce_annotations", lambda: lambda: _enforced(0.5, val_b=2)),
+        ("import/interpreter", lambda: _import(None)),
+        ("import/runtime_check", lambda: _import("runtime_check")),
+        ("import/runtime_check+numpy", lambda: _import("runtime_check, numpy")),
+    ]
+    if hasattr(typing, 'Protocol'):
+        # typing.Protocol is new in python 3.8, the case is skipped before
+        cases.insert(3, ("type/protocol", lambda: _call(*_plugin())))
+    for size in DEEP_SIZES:
+        cases.append(("deep/list/{}".format(size),
+                      lambda size=size: _deep(TypeChecker[List[int]], list(range(size)))))
+        cases.append(("deep/dict/{}".format(size),
+                      lambda size=size: _deep(TypeChecker[Dict[str, float]], {str(i): 0.5 for i in range(size)})))
+        cases.append(("deep/array/{}".format(size),
+                      lambda size=size: _deep(TypeChecker[Iterable[float]], array('d', range(size)))))
+        cases.append(("deep/typed_list/{}".format(size),
+                      lambda size=size: _deep(TypeChecker[List[int]], TypedList[int](range(size)))))
+        cases.append(("deep/rows/{}".format(size),
+                      lambda size=size: _deep(TypeChecker[List[Tuple[int, float]]], [(i, 0.5) for i in range(size)])))
+        cases.append(("deep/bound_array/{}".format(size), lambda size=size: _call(BoundChecker[(0, 1)], _random(size))))
+        cases.append(("parallel/rows/{}".format(size),
+                      lambda size=size: _parallel(TypeChecker[List[Tuple[int, float]]],
+                                                  [(i, 0.5) for i in range(size)])))
+        cases.append(("schema/{}".format(size),
+                      lambda size=size: _call(Schema({'id': int, 'score': (float, (0, 1)), 'age': (None, (0, 150))}),
+                                              _table(size))))
+        cases.append(("parallel/bound_array/{}".format(size),
+                      lambda size=size: _parallel(BoundChecker[(0, 1)], _random(size))))
+    return cases
+
+
+def _time_per_call(func):
+    """
+    Returns the best time per call of func, in nanoseconds.
+
+    :param func: (callable) the benchmarked function, without arguments
+    :return: (float) time in ns
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < MIN_TIME and number < 10 ** 7:
+        number *= 10
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number * 1e9
+
+
+def run(name_filter=""):
+    """
+    Runs the benchmarked cases.
+
+    :param name_filter: (str) only the cases whose name contains it are run
+    :return: ({str: float}) the time per call in ns of every case
+    """
+    results = {}
+    for name, build in _cases():
+        if name_filter in name:
+            results[name] = _time_per_call(build())
+            print("{:<36}{:>16.1f} ns".format(name, results[name]))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results with a baseline, and prints the change of every case.
+
+    :param results: ({str: float}) the time per call in ns of every case
+    :param baseline: ({str: float}) the time per call in ns of the baseline
+    :param threshold: (float) the allowed slowdown, in percent
+    :return: ([str]) the cases that regressed past the threshold
+    """
+    regressions = []
+    for name, time in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = (time / baseline[name] - 1) * 100
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print("{:<36}{:>12.1f}{:>12.1f}{:>+10.1f}%{}".format(name, baseline[name], time, change,
+                                                         "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmark from the command line.
+
+    :param argv: ([str]) the command line arguments
+    :return: (int) the exit code, 1 if a case regressed
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of runtime_check")
+    parser.add_argument("--output", help="JSON file where the results are stored")
+    parser.add_argument("--compare", help="JSON file of baseline results to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent (default 10)")
+    parser.add_argument("--filter", default="", help="only run the cases containing this string")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"python": platform.python_version(), "results": results}, output, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        print()
+        print("{:<36}{:>12}{:>12}{:>11}".format("case", "baseline ns", "current ns", "change"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n{} case(s) regressed more than {}%: {}".format(len(regressions), args.threshold,
+                                                                 ", ".join(regressions)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,12 @@ This library allows the checking of:
 # inspired blackmagic https://www.youtube.com/watch?v=Je8TcRQcUgA
 # python 3 only type and bound checking
 
-from runtime_check.check_type import TypeChecker, DEEP
+from runtime_check.check_type import TypeChecker, DEEP, Sampling
 from runtime_check.check_bounds import BoundChecker
-from runtime_check.wrappers import check_bound_at_run, check_type_at_run, enforce_annotations
+from runtime_check.check_array import ArraySpec
+from runtime_check.schema import Schema
+from runtime_check.containers import TypedList, TypedDict, TypedSet
+from runtime_check.wrappers import check_bound_at_run, check_type_at_run, enforce_annotations, check_class_at_run
+from runtime_check.config import set_level, get_level, checking, Options
+from runtime_check.profiling import stats, stats_table, stats_json, reset_stats
+from runtime_check.parallel import Parallel
@@ -0,0 +1,93 @@
+"""
+This module contains the sampling of the calls of the decorated functions, used to check only a share of the calls
+
+A decorated function with a rate checks each call with this probability. The calls between two checked calls are
+counted down in the wrapper, so an unchecked call costs a decrement and a comparison, less than a dict lookup.
+With a max_overhead, the rate is adapted to the measured time of the checks and of the function, so that the checks
+take about this share of the run time. After a failed check, the next RECOVERY_CALLS calls are all checked.
+"""
+
+from math import log
+from random import random
+
+MIN_RATE = 0.001  # the lowest adapted rate, so that a failure is still found
+RECOVERY_CALLS = 100
+SMOOTHING = 0.1  # the weight of the last checked call in the measured times
+
+
+class CallSampler(object):
+    """
+    The sampling state of a decorated function, draws the number of calls until the next checked call.
+
+    :param rate: (float) the probability that a call is checked, in ]0, 1]. Defaults to 1 with a max_overhead.
+    :param max_overhead: (float) the target share of the run time spent in the checks, in ]0, 1[, None to keep
+        the rate fixed
+    """
+    __slots__ = ('rate', 'max_overhead', 'recovery', 'check_ns', 'body_ns')
+
+    def __init__(self, rate=None, max_overhead=None):
+        if rate is not None and not 0 < rate <= 1:
+            raise ValueError("The rate of checked calls must be in ]0, 1], got {}".format(rate))
+        if max_overhead is not None and not 0 < max_overhead < 1:
+            raise ValueError("The max overhead must be in ]0, 1[, got {}".format(max_overhead))
+        self.rate = 1.0 if rate is None else rate
+        self.max_overhead = max_overhead
+        self.recovery = 0
+        self.check_ns = None
+        self.body_ns = None
+
+    def __repr__(self):
+        return "CallSampler(rate={}, max_overhead={})".format(self.rate, self.max_overhead)
+
+    @property
+    def adaptive(self):
+        """
+        :return: (bool) whether the rate is adapted to the measured overhead
+        """
+        return self.max_overhead is not None
+
+    def interval(self):
+        """
+        Draws the number of calls until the next checked call, so that every call is checked with the probability rate.
+
+        :return: (int) the number of calls, 1 if the next call is checked
+        """
+        if self.recovery > 0:
+            self.recovery -= 1
+            return 1
+        if self.rate >= 1:
+            return 1
+        # geometric distribution of the calls between two successes of probability rate
+        return int(log(1.0 - random()) / log(1.0 - self.rate)) + 1
+
+    def failed(self):
+        """
+        Records a failed check, the following calls are all checked.
+
+        :return: (int) the number of calls until the next checked call
+        """
+        self.recovery = RECOVERY_CALLS
+        return 1
+
+    def record(self, start, checked, called, end):
+        """
+        Records the time of a checked call, and adapts the rate to the overhead.
+
+        :param start: (int) the time in ns before the checks of the arguments
+        :param checked: (int) the time in ns before the call of the function
+        :param called: (int) the time in ns before the check of the return value
+        :param end: (int) the time in ns after the check of the return value
+        """
+        check_ns = checked - start + end - called
+        body_ns = called - checked
+        if self.check_ns is None:
+            self.check_ns, self.body_ns = check_ns, body_ns
+        else:
+            self.check_ns += (check_ns - self.check_ns) * SMOOTHING
+            self.body_ns += (body_ns - self.body_ns) * SMOOTHING
+        if self.check_ns <= 0:
+            self.rate = 1.0
+            return
+        # the share of the checks is (rate * check) / (rate * check + body)
+        rate = self.max_overhead * self.body_ns / ((1 - self.max_overhead) * self.check_ns)
+        self.rate = min(1.0, max(MIN_RATE, rate))
@@ -0,0 +1,181 @@
+"""
+This module is used for the specification of numpy arrays
+
+numpy is an optional dependency, imported on the first use of an ArraySpec. The other checks only handle arrays
+once numpy was imported by someone else: before that, no value can be an array.
+"""
+
+import sys
+
+from runtime_check import violations
+
+
+def _numpy():
+    """
+    Imports numpy on first use.
+
+    :return: (module) numpy
+    """
+    import numpy
+    return numpy
+
+
+def _is_array(val):
+    """
+    Checks whether val is a numpy array, without importing numpy.
+
+    :param val: (Any)
+    :return: (bool)
+    """
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(val, numpy.ndarray)
+
+
+def _abstract_dtypes():
+    """
+    :return: (tuple) the abstract numpy types, that are matched with numpy.issubdtype
+    """
+    np = _numpy()
+    return (np.generic, np.number, np.integer, np.signedinteger, np.unsignedinteger, np.inexact, np.floating,
+            np.complexfloating, np.flexible, np.character)
+
+
+class _ArraySpecMeta(type):
+    """
+    Meta class used for the ArraySpec[] notation.
+    """
+
+    def __getitem__(cls, key):
+        if isinstance(key, tuple):
+            return cls(*key)
+        return cls(key)
+
+
+class ArraySpec(object, metaclass=_ArraySpecMeta):
+    """
+    Specification of a numpy array, checked from the array header only: the elements are never read.
+
+    ex:
+        ArraySpec[numpy.float32, (None, 3)]  # float32 arrays of shape (n, 3)
+        ArraySpec[numpy.floating, ("N", "N"), 'C']  # C contiguous square arrays of floats
+
+    :param dtype: (numpy dtype or type) the expected dtype, abstract types such as numpy.floating accept any
+        of their sub types, None for any dtype
+    :param shape: (tuple) the expected shape, where every dimension is either an int, None for any size,
+        or a str for a symbolic size. None for any shape.
+    :param order: (str) 'C' or 'F' for a C or Fortran contiguous array, None for any memory layout
+
+    A symbolic size must be the same everywhere it is used in an array, and with check_type_at_run in all the
+    arguments and the return value of a call.
+    The spec can be used as a type (in TypeChecker[] or check_type_at_run), or called as a checking function.
+    """
+    __slots__ = ('dtype', 'shape', 'order', '_check')
+
+    def __init__(self, dtype=None, shape=None, order=None):
+        if dtype is not None and not (isinstance(dtype, type) and dtype in _abstract_dtypes()):
+            dtype = _numpy().dtype(dtype)
+        if shape is not None:
+            if not isinstance(shape, tuple):
+                raise ValueError("The shape must be a tuple, got {}".format(shape))
+            for dim in shape:
+                if not (dim is None or isinstance(dim, str) or (isinstance(dim, int) and dim >= 0)):
+                    raise ValueError("The dimensions of the shape can be None, a str or a positive int, got {}"
+                                     .format(dim))
+        if order not in (None, 'C', 'F'):
+            raise ValueError("The order can be 'C', 'F' or None, got {}".format(order))
+        self.dtype = dtype
+        self.shape = shape
+        self.order = order
+        self._check = self._compile()
+
+    def __call__(self, val):
+        """
+        Checks that val is valid, will raise an error if not valid (or report it, see violations).
+
+        :param val: (Any)
+        """
+        if not self._check(val):
+            violations._keyed_site(self, TypeError, self._message).fail(val)
+
+    def _message(self, val, _):
+        """
+        :param val: (Any) an invalid value
+        :return: (str) the message of the error
+        """
+        if _is_array(val):
+            return "Expected {}, got an array of {} with the shape {}".format(self, val.dtype, val.shape)
+        return "Expected {}, got {}".format(self, val.__class__)
+
+    def __repr__(self):
+        return "ArraySpec[{}, {}, {}]".format(self.dtype, self.shape, self.order)
+
+    def __eq__(self, other):
+        return isinstance(other, ArraySpec) and (self.dtype, self.shape, self.order) == \
+                                                (other.dtype, other.shape, other.order)
+
+    def __hash__(self):
+        return hash((ArraySpec, self.dtype, self.shape, self.order))
+
+    @property
+    def symbols(self):
+        """
+        :return: ({str: [int]}) the symbolic sizes of the shape, and the dimensions where they are used
+        """
+        symbols = {}
+        for axis, dim in enumerate(self.shape or ()):
+            if isinstance(dim, str):
+                symbols.setdefault(dim, []).append(axis)
+        return symbols
+
+    def _compile(self):
+        """
+        Returns the checking function of the spec, symbolic sizes are only checked within the array.
+
+        :return: (callable) function that takes a value and returns whether it is a valid array
+        """
+        np = _numpy()
+        dtype, order = self.dtype, self.order
+        abstract_dtype = isinstance(dtype, type)
+        ndim = None if self.shape is None else len(self.shape)
+        fixed = [(axis, dim) for axis, dim in enumerate(self.shape or ()) if isinstance(dim, int)]
+        repeated = [axes for axes in self.symbols.values() if len(axes) > 1]
+
+        def check(val):
+            if not isinstance(val, np.ndarray):
+                return False
+            if dtype is not None:
+                if abstract_dtype:
+                    if not np.issubdtype(val.dtype, dtype):
+                        return False
+                elif val.dtype != dtype:
+                    return False
+            if ndim is not None:
+                shape = val.shape
+                if len(shape) != ndim:
+                    return False
+                for axis, dim in fixed:
+                    if shape[axis] != dim:
+                        return False
+                for axes in repeated:
+                    for axis in axes[1:]:
+                        if shape[axis] != shape[axes[0]]:
+                            return False
+            if order == 'C':
+                return val.flags.c_contiguous
+            elif order == 'F':
+                return val.flags.f_contiguous
+            return True
+        return check
+
+    def _bind(self, val, dims):
+        """
+        Unifies the symbolic sizes of an array with the sizes already bound.
+
+        :param val: (numpy.ndarray) an array valid for the spec
+        :param dims: ({str: int}) the sizes of the symbols, updated with the symbols of the array
+        :return: (bool) whether the sizes are consistent
+        """
+        for axis, dim in enumerate(self.shape):
+            if isinstance(dim, str) and dims.setdefault(dim, val.shape[axis]) != val.shape[axis]:
+                return False
+        return True
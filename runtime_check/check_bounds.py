@@ -3,10 +3,17 @@ This module is used for bound checking on numbers
 """
 
 import operator
+from bisect import bisect_right
+from typing import Union, Any, Callable, Dict  # pylint: disable=unused-import
 
-import numpy as np
+from runtime_check import parallel, validated, violations
+from runtime_check.check_array import _numpy, _is_array
+from runtime_check.check_type import _batch_result
+from runtime_check.config import _OPTIONS
 
-from runtime_check.check_type import TypeChecker
+COUNT_VIOLATIONS = False
+
+_COMPILED = {}  # type: Dict[Any, Callable]
 
 
 class _BoundCheckerMeta(type):
@@ -19,26 +26,139 @@ class _BoundCheckerMeta(type):
         """
         Checks whether a value in within specific bounds.
 
-        :param val: (int, float)
+        :param val: (int, float, numpy.ndarray)
         :param key: (tuples) (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
                              or (Lower_bound, Upper_bound)
-        :return: (bool) is in bounds
-        """
-        TypeChecker.scalar(val)
-        if isinstance(key, tuple) and len(key) == 2:
-            TypeChecker.scalar(key[0])
-            TypeChecker.scalar(key[1])
-            return key[0] <= val <= key[1]
-        elif isinstance(key, tuple) and len(key) == 3 and isinstance(key[2], tuple) and len(key[2]) == 2:
-            TypeChecker.scalar(key[0])
-            TypeChecker.scalar(key[1])
-            TypeChecker[bool](key[2][0])
-            TypeChecker[bool](key[2][1])
-            return (operator.le if key[2][0] else operator.lt)(key[0], val) and \
-                   (operator.le if key[2][1] else operator.lt)(val, key[1])
+        :return: (bool or numpy.ndarray) is in bounds, elementwise for an array
+        """
+        return mcs._compile(key)(val)
+
+    @classmethod
+    def _parse(mcs, key):
+        """
+        Validates bounds, and normalizes them into a sorted list of disjoint intervals.
+
+        :param key: (tuples or [tuples]) (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
+                                         or (Lower_bound, Upper_bound)
+        :return: ([(Lower_bound, Upper_bound, Include_lower_bound, Include_upper_bound)]) the merged intervals
+        """
+        if isinstance(key, list) or isinstance(key, tuple) and all([isinstance(k, tuple) for k in key]):
+            keys = key
         else:
-            raise ValueError("The bound tuple can be of structure: (Lower_bound, Upper_bound, (Include_lower_bound, " +
-                          "Include_upper_bound)) or (Lower_bound, Upper_bound)")
+            keys = [key]
+
+        intervals = []
+        for bound in keys:
+            if isinstance(bound, tuple) and len(bound) == 2:
+                include = (True, True)
+            elif isinstance(bound, tuple) and len(bound) == 3 and isinstance(bound[2], tuple) and len(bound[2]) == 2:
+                include = bound[2]
+                # the spec is checked directly, not with the checkers that report to violations.HANDLER
+                if not (isinstance(include[0], bool) and isinstance(include[1], bool)):
+                    raise TypeError("Expected bools for Include_lower_bound and Include_upper_bound, got {}".format(
+                        include))
+            else:
+                raise ValueError("The bound tuple can be of structure: (Lower_bound, Upper_bound, " +
+                                 "(Include_lower_bound, Include_upper_bound)) or (Lower_bound, Upper_bound)")
+            if not (isinstance(bound[0], (int, float)) and isinstance(bound[1], (int, float))):
+                raise TypeError("Expected numbers for Lower_bound and Upper_bound, got {}".format(bound[:2]))
+            if not bound[0] <= bound[1]:
+                raise ValueError("The lower bound must not be greater than the upper bound, got {}".format(bound))
+            intervals.append((bound[0], bound[1], include[0], include[1]))
+
+        # the closed lower bounds are sorted first, so they are kept when merging equal lower bounds
+        intervals.sort(key=lambda interval: (interval[0], not interval[2]))
+        merged = []
+        for low, high, include_low, include_high in intervals:
+            if merged:
+                last_low, last_high, last_include_low, last_include_high = merged[-1]
+                if low < last_high or (low == last_high and (last_include_high or include_low)):
+                    if high > last_high:
+                        merged[-1] = (last_low, high, last_include_low, include_high)
+                    elif high == last_high:
+                        merged[-1] = (last_low, high, last_include_low, last_include_high or include_high)
+                    continue
+            merged.append((low, high, include_low, include_high))
+        return merged
+
+    @classmethod
+    def _compile(mcs, key):
+        """
+        Returns the checking function for bounds, the bounds are validated once here.
+
+        :param key: (tuples or [tuples]) (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
+                                         or (Lower_bound, Upper_bound)
+        :return: (callable) function that takes a value and returns whether it is in bounds, elementwise for an array.
+            Raises a TypeError if the value is not a number.
+        """
+        try:
+            return _COMPILED[key]
+        except KeyError:
+            in_bounds = mcs._build(key)
+            _COMPILED[key] = in_bounds
+            return in_bounds
+        except TypeError: # unhashable key, cannot be cached
+            return mcs._build(key)
+
+    @classmethod
+    def _build(mcs, key):
+        """
+        Builds the checking function for bounds, see _compile.
+
+        :param key: (tuples or [tuples]) (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
+                                         or (Lower_bound, Upper_bound)
+        :return: (callable) function that takes a value and returns whether it is in bounds
+        """
+        intervals = mcs._parse(key)
+        lows = [interval[0] for interval in intervals]
+
+        if len(intervals) == 1:
+            low, high, include_low, include_high = intervals[0]
+            lower_op = operator.le if include_low else operator.lt
+            upper_op = operator.le if include_high else operator.lt
+
+            def scalar_in_bounds(val):
+                return (low < val or (include_low and low == val)) and (val < high or (include_high and val == high))
+
+            def array_in_bounds(val):
+                return lower_op(low, val) & upper_op(val, high)
+        else:
+            def scalar_in_bounds(val):
+                index = bisect_right(lows, val) - 1
+                if index < 0:
+                    return False
+                low, high, include_low, include_high = intervals[index]
+                return (low < val or (include_low and low == val)) and (val < high or (include_high and val == high))
+
+            array_bounds = None
+
+            def array_in_bounds(val):
+                nonlocal array_bounds
+                np = _numpy()
+                bounds = array_bounds
+                if bounds is None:
+                    # built on the first array, as numpy may not be imported before, and assigned once complete so
+                    # that the other threads see either None or every column
+                    bounds = array_bounds = tuple(np.array(column) for column in zip(*intervals))
+                array_lows, array_highs, array_include_lows, array_include_highs = bounds
+                index = np.searchsorted(array_lows, val, side='right') - 1
+                valid = index >= 0
+                index = np.maximum(index, 0)
+                low, high = array_lows[index], array_highs[index]
+                valid &= (low < val) | (array_include_lows[index] & (low == val))
+                valid &= (val < high) | (array_include_highs[index] & (val == high))
+                return valid
+
+        def in_bounds(val):
+            if _is_array(val):
+                np = _numpy()
+                if not (np.issubdtype(val.dtype, np.number) or val.dtype == np.bool_):
+                    raise TypeError("Expected an array of numbers, got an array of {}".format(val.dtype))
+                return array_in_bounds(val)
+            elif not isinstance(val, (int, float)):
+                raise TypeError("Expected {}, got {}".format(Union[int, float], val.__class__))
+            return scalar_in_bounds(val)
+        return in_bounds
 
     @classmethod
     def _validater(mcs, key):
@@ -49,18 +169,21 @@ class _BoundCheckerMeta(type):
                                          or (Lower_bound, Upper_bound)
         :retrun: (callable) function that takes value and will raise an error if not valid
         """
+        in_bounds = mcs._compile(key)
+        site = violations._keyed_site((BoundChecker, key), ValueError, lambda val, valid: "Number out of bounds {}, "
+                                      "expected bounds {}".format(_out_of_bounds(val, valid), key))
+        not_number = violations._keyed_site((BoundChecker, TypeError, key), TypeError, _not_number)
+
         def check(val):
             """
-            Checks that val is valid, will raise an error if not valid.
+            Checks that val is valid, will raise an error if not valid (or report it, see violations).
 
-            :param val: (int, float)
+            :param val: (int, float, numpy.ndarray)
             """
-            if isinstance(key, list) or isinstance(key, tuple) and all([isinstance(k, tuple) for k in key]):
-                valid = any([mcs._in_bounds(val, k) for k in key])
-            else:
-                valid = mcs._in_bounds(val, key)
-            if not valid:
-                raise ValueError("Number out of bounds {}, expected bounds {}".format(val, key))
+            options = _OPTIONS.get()
+            if options is not None and options.enabled is False:
+                return
+            _check_bounds(site, not_number, in_bounds, val)
 
         return check
 
@@ -68,6 +191,87 @@ class _BoundCheckerMeta(type):
         return mcs._validater(key)
 
 
+def _check_bounds(site, not_number, in_bounds, val):
+    """
+    Checks a value against compiled bounds, a failure goes to a site (see violations).
+
+    :param site: (violations._Site) the site of the values out of bounds
+    :param not_number: (violations._Site) the site of the values that are not numbers, or arrays of numbers
+    :param in_bounds: (callable) the compiled check of the bounds
+    :param val: (Any) the checked value
+    """
+    valid = error = None
+    try:
+        if _is_array(val):
+            if _array_in_bounds(in_bounds, val):
+                return
+            valid = in_bounds(val)
+            if valid.all():
+                return
+        elif in_bounds(val):
+            return
+    except TypeError as ex:  # not a number
+        error = str(ex)
+    if error is None:
+        site.fail(val, valid)
+    else:
+        not_number.fail(val, error)
+
+
+def _out_of_bounds(val, valid):
+    """
+    :param val: (Any) a value out of bounds
+    :param valid: (numpy.ndarray) the elementwise result of the check of an array, None for a number
+    :return: (str) the description of the value, see _array_violation
+    """
+    return val if valid is None else _array_violation(val, valid)
+
+
+def _not_number(val, error):
+    """
+    :param val: (Any) a value that is not a number
+    :param error: (str) the message of the error
+    :return: (str) the message of the error
+    """
+    return error
+
+
+def _array_in_bounds(in_bounds, val):
+    """
+    Checks the arrays that are validated at once: in parallel (see parallel), or that already passed the check
+    (see validated). The valid arrays that cannot change are recorded.
+
+    :param in_bounds: (callable) the compiled check of the bounds
+    :param val: (numpy.ndarray) the checked array
+    :return: (bool) True if the array is in bounds, False if it must be checked elementwise
+    """
+    if validated.REMEMBER:
+        if validated._seen(in_bounds, val):
+            return True
+        valid = parallel.PARALLEL is not None and parallel._array_all(in_bounds, val)
+        if valid or in_bounds(val).all():
+            validated._remember(in_bounds, val)
+            return True
+        return False
+    return parallel.PARALLEL is not None and bool(parallel._array_all(in_bounds, val))
+
+
+def _array_violation(val, valid):
+    """
+    Describes the first value of an array that is out of bounds.
+
+    :param val: (numpy.ndarray) the checked array
+    :param valid: (numpy.ndarray) the elementwise result of the check, with at least one False
+    :return: (str) the value, its index and if COUNT_VIOLATIONS is set the number of values out of bounds
+    """
+    np = _numpy()
+    index = tuple(int(i) for i in np.unravel_index(np.argmin(valid), valid.shape))
+    description = "{} at index {}".format(val[index], index if len(index) != 1 else index[0])
+    if COUNT_VIOLATIONS:
+        description += " ({} of {} values)".format(valid.size - np.count_nonzero(valid), valid.size)
+    return description
+
+
 class BoundChecker(object, metaclass=_BoundCheckerMeta):
     """
     Class used to check whether a number is in given bounds.
@@ -79,35 +283,80 @@ class BoundChecker(object, metaclass=_BoundCheckerMeta):
     the tuple defining the bounds are (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
         or (Lower_bound, Upper_bound)
     You may use lists of bounds to define discontinuous bounds.
+    NumPy arrays are checked elementwise, the first value out of bounds is reported.
     """
 
+    @classmethod
+    def validate_many(cls, key, values):
+        """
+        Checks whether every value of a batch is in bounds, without raising an error.
+        The batch is checked at once if it is (or converts to) an array of numbers, the values that are not
+        numbers are invalid.
+
+        ex:
+            result = BoundChecker.validate_many((0, 1), probabilities)
+            print(result.count, "values out of bounds at", result.failures)
+
+        :param key: (tuples or [tuples]) (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
+                                         or (Lower_bound, Upper_bound)
+        :param values: (Iterable) the numbers, an array is checked elementwise
+        :return: (BatchResult) the mask of the valid values, the indices (in the flattened array) and the number
+            of the invalid values, as numpy arrays (numpy is imported on the first call)
+        """
+        np = _numpy()
+        in_bounds = cls._compile(key)
+        options = _OPTIONS.get()
+        disabled = options is not None and options.enabled is False
+
+        def is_valid(val):
+            return isinstance(val, (int, float)) and bool(in_bounds(val))
+
+        if _is_array(values):
+            if disabled:
+                return _batch_result(np.ones(values.shape, dtype=bool))
+            elif np.issubdtype(values.dtype, np.number) or values.dtype == np.bool_:
+                valid = parallel._array_map(in_bounds, values) if parallel.PARALLEL is not None else None
+                return _batch_result(np.asarray(in_bounds(values) if valid is None else valid, dtype=bool))
+            return _batch_result(np.array([is_valid(val) for val in values.flat], dtype=bool).reshape(values.shape))
+
+        values = list(values)
+        if disabled:
+            return _batch_result(np.ones(len(values), dtype=bool))
+        # only numbers are converted, the rows of different lengths raise or warn in numpy.array
+        if all(issubclass(kind, (int, float, np.number, np.bool_)) for kind in set(map(type, values))):
+            array = np.array(values)
+            if array.ndim == 1 and (np.issubdtype(array.dtype, np.number) or array.dtype == np.bool_):
+                valid = parallel._array_map(in_bounds, array) if parallel.PARALLEL is not None else None
+                return _batch_result(np.asarray(in_bounds(array) if valid is None else valid, dtype=bool))
+        return _batch_result(np.fromiter((is_valid(val) for val in values), dtype=bool, count=len(values)))
+
     @classmethod
     def positive(cls, val):
         """
         Checks whether val is positive.
         """
-        cls._validater((0, np.inf))(val)
+        cls._validater((0, float('inf')))(val)
 
     @classmethod
     def negative(cls, val):
         """
         Checks whether val is negative.
         """
-        cls._validater((-np.inf, 0))(val)
+        cls._validater((-float('inf'), 0))(val)
 
     @classmethod
     def positive_not_zero(cls, val):
         """
         Checks whether val is positive and not zero.
         """
-        cls._validater((0, np.inf, (False, True)))(val)
+        cls._validater((0, float('inf'), (False, True)))(val)
 
     @classmethod
     def negative_not_zero(cls, val):
         """
         Checks whether val is negative and not zero.
         """
-        cls._validater((-np.inf, 0, (True, False)))(val)
+        cls._validater((-float('inf'), 0, (True, False)))(val)
 
     @classmethod
     def probability(cls, val):
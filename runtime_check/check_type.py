@@ -2,11 +2,348 @@
 This module is used for type checking
 """
 
-from typing import List, Union, Dict, Tuple, Any, Set, TypeVar, Callable, Mapping, Iterator, Iterable
+import random
+import threading
+import weakref
+from array import array
+from abc import ABCMeta, get_cache_token
+from collections import namedtuple
+from itertools import islice
+from time import perf_counter
+from collections import abc as collections_abc
+from typing import List, Union, Any, TypeVar, Iterable, Callable, Dict  # pylint: disable=unused-import
 
-import numpy as np
+from runtime_check import parallel, validated, violations
+from runtime_check.check_array import ArraySpec, _numpy, _is_array
+from runtime_check.config import _OPTIONS, _INHERITED
 
+# the process wide defaults, overridden in a context by config.checking
 DEEP = False
+SAMPLING = None
+
+_COMPILED = {}  # type: Dict[Any, Callable]
+_STATE = threading.local()
+
+# the checking functions whose result only depends on the type of the value,
+# mapped to whether they use abstract classes (whose subclasses can be registered later)
+_TYPE_ONLY = {}
+_TYPE_CACHE_SIZE = 256
+_MISSING = object()
+# the sample of a 0-d array, that is not iterable
+_UNSIZED = object()
+# the checking functions mapped to exact types that are valid for them, used to scan the elements of containers
+# by their type only, the other types (such as subclasses) go through the checking function
+_EXACT_TYPES = {}
+# the checking functions of containers, mapped to their walk for containers of containers (else None), see _walk
+_CONTAINERS = {}
+# the checking functions of containers whose elements are containers of plain elements, that are not walked:
+# they are too shallow to need it, but the containers of their values are walked
+_NESTED = set()
+# the containers that can be split in chunks and checked in parallel, see parallel
+_SPLITTABLE = (list, tuple, set, frozenset, dict)
+# the sequences whose elements are all of the same type: str for a str, int for bytes
+_TEXT = (str, bytes, bytearray)
+# the collections.abc classes whose parameterized generics are deep checked, see _sequence_of
+_ABSTRACT_COLLECTIONS = (collections_abc.Sequence, collections_abc.MutableSequence, collections_abc.Set,
+                         collections_abc.MutableSet, collections_abc.Collection)
+# the protocols mapped to the verdicts of their structural checks per class, see _structural
+_PROTOCOLS = {}  # type: Dict[type, Dict[type, Any]]
+# the checking functions cached per type of value mapped to their verdicts, see _type_cached
+_TYPE_CACHES = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary[Callable, Dict[type, bool]]
+# the attributes of the protocol classes that are not members of the protocols
+_PROTOCOL_INTERNALS = frozenset([
+    '__abstractmethods__', '__annotations__', '__weakref__', '__dict__', '__args__', '__slots__', '__doc__',
+    '__module__', '__qualname__', '__init__', '__new__', '__init_subclass__', '__subclasshook__', '__class_getitem__',
+    '__parameters__', '__origin__', '__orig_bases__', '__extra__', '__tree_hash__', '__next_in_mro__', '_gorg',
+    '_is_protocol', '_is_runtime_protocol', '__protocol_attrs__', '__non_callable_proto_members__',
+    '__callable_proto_members_only__', '__type_params__', '_MutableMapping__marker'])
+
+CheckResult = namedtuple('CheckResult', ['valid', 'exhaustive', 'checked'])
+CheckResult.__doc__ = """
+The result of a deep check.
+
+:param valid: (bool) whether the value is valid for the checked elements
+:param exhaustive: (bool) whether every element was checked, False if the check was sampled
+:param checked: (int) the number of container elements that were checked
+"""
+
+BatchResult = namedtuple('BatchResult', ['valid', 'failures', 'count'])
+BatchResult.__doc__ = """
+The result of the check of a batch of values.
+
+:param valid: (numpy.ndarray) the mask of the valid values
+:param failures: (numpy.ndarray) the indices of the invalid values, in the flattened batch for an array
+:param count: (int) the number of invalid values
+"""
+
+
+def _batch_result(valid):
+    """
+    :param valid: (numpy.ndarray) the mask of the valid values
+    :return: (BatchResult)
+    """
+    failures = _numpy().flatnonzero(~valid)
+    return BatchResult(valid, failures, len(failures))
+
+
+class Sampling(object):
+    """
+    Limits the elements visited when DEEP checking containers.
+
+    ex:
+        runtime_check.check_type.SAMPLING = Sampling(first=100)
+        Sampling(sample=10, max_time=1e-3)
+
+    :param first: (int) only the first elements of every container are checked
+    :param sample: (int) only a random sample of the elements of every container is checked.
+        Sets and dicts are not indexable, their first elements in iteration order are used.
+    :param max_elements: (int) the check stops after this many elements in total
+    :param max_time: (float) the check stops after this many seconds
+
+    The checks are compiled once per key and Sampling, equal Samplings share them: do not modify a Sampling once used.
+    """
+    __slots__ = ('first', 'sample', 'max_elements', 'max_time')
+
+    def __init__(self, first=None, sample=None, max_elements=None, max_time=None):
+        self.first = first
+        self.sample = sample
+        self.max_elements = max_elements
+        self.max_time = max_time
+
+    def __repr__(self):
+        return "Sampling(first={}, sample={}, max_elements={}, max_time={})".format(
+            self.first, self.sample, self.max_elements, self.max_time)
+
+    def __eq__(self, other):
+        return isinstance(other, Sampling) and (self.first, self.sample, self.max_elements, self.max_time) == \
+                                               (other.first, other.sample, other.max_elements, other.max_time)
+
+    def __hash__(self):
+        return hash((Sampling, self.first, self.sample, self.max_elements, self.max_time))
+
+
+_EXHAUSTIVE = Sampling()
+
+
+class _Budget(object):
+    """
+    The state of a sampled check, selects the container elements that are checked.
+
+    :param sampling: (Sampling) the limits of the check
+    """
+    __slots__ = ('first', 'sample', 'remaining', 'deadline', 'checked', 'exhaustive')
+
+    def __init__(self, sampling):
+        self.first = sampling.first
+        self.sample = sampling.sample
+        self.remaining = sampling.max_elements
+        self.deadline = None if sampling.max_time is None else perf_counter() + sampling.max_time
+        self.checked = 0
+        self.exhaustive = True
+
+    def select(self, container):
+        """
+        Yields the elements of a container that should be checked.
+
+        :param container: (Sized and Iterable) the container, or the items of a dict
+        """
+        size = len(container)
+        count = size if self.first is None else min(size, self.first)
+        if self.sample is not None and self.sample < count:
+            if isinstance(container, (list, tuple)):
+                container = [container[i] for i in sorted(random.sample(range(count), self.sample))]
+            count = self.sample
+        if count < size:
+            self.exhaustive = False
+
+        for elem in islice(container, count):
+            if self.remaining is not None:
+                if self.remaining <= 0:
+                    self.exhaustive = False
+                    return
+                self.remaining -= 1
+            if self.deadline is not None and not self.checked & 63 and perf_counter() > self.deadline:
+                self.exhaustive = False
+                return
+            self.checked += 1
+            yield elem
+
+
+def _run_sampled(check, val, sampling):
+    """
+    Runs a checking function compiled for a sampling, with a new budget.
+
+    :param check: (callable) the checking function, compiled with sampling
+    :param val: (Any) the checked value
+    :param sampling: (Sampling) the limits of the check
+    :return: (CheckResult) the result of the check
+    """
+    budget = _Budget(sampling)
+    previous = getattr(_STATE, 'budget', None)
+    _STATE.budget = budget
+    try:
+        valid = check(val)
+    finally:
+        _STATE.budget = previous
+    return CheckResult(valid, budget.exhaustive, budget.checked)
+
+
+def _current_deep(deep):
+    """
+    Returns whether the checks are deep, in the current context.
+
+    :param deep: (bool) overrides the deep option of the context and DEEP
+    :return: (bool) False if the checks are disabled
+    """
+    options = _OPTIONS.get()
+    if options is None:
+        return DEEP if deep is None else deep
+    if options.enabled is False:
+        return False
+    if deep is None:
+        return DEEP if options.deep is None else options.deep
+    return deep
+
+
+def _accept(val):
+    """
+    Checking function of typing.Any.
+    """
+    return True
+
+
+def _is_none(val):
+    """
+    Checking function of None.
+    """
+    return val is None
+
+
+def _type_only(check, abstract=False):
+    """
+    Marks a checking function whose result only depends on the type of the value.
+
+    :param check: (callable) the checking function
+    :param abstract: (bool) whether the check uses abstract classes
+    :return: (callable) check
+    """
+    _TYPE_ONLY[check] = abstract
+    return check
+
+
+def _exact_types(check, types):
+    """
+    Marks a checking function that is valid for the values of some exact types.
+
+    :param check: (callable) the checking function
+    :param types: (Iterable) the types, whose values are all valid
+    :return: (callable) check
+    """
+    if types:
+        _EXACT_TYPES[check] = frozenset(types)
+    return check
+
+
+def _container(check):
+    """
+    Marks the checking function of a container whose elements are not containers.
+
+    :param check: (callable) the checking function
+    :return: (callable) check
+    """
+    _CONTAINERS[check] = None
+    return check
+
+
+def _nested(check):
+    """
+    Marks the checking function of a container whose elements are containers of plain elements, see _NESTED.
+
+    :param check: (callable) the checking function
+    :return: (callable) check
+    """
+    _NESTED.add(check)
+    return _container(check)
+
+
+def _walks(elem_check):
+    """
+    :param elem_check: (callable) the checking function of elements
+    :return: (bool) whether the containers of such elements are walked, see _walk
+    """
+    return _CONTAINERS.get(elem_check) is not None or elem_check in _NESTED
+
+
+def _marked(elem_checks):
+    """
+    :param elem_checks: ([callable]) the checking functions of the elements of a container that is not walked
+    :return: (callable) _nested or _container, the mark of the checking function of the container
+    """
+    return _nested if any(elem_check in _CONTAINERS for elem_check in elem_checks) else _container
+
+
+def _walked(walk):
+    """
+    Returns the checking function of a container whose elements are containers, that runs walk with _walk.
+
+    :param walk: (callable) generator function, that takes a value, yields the (checking function, element) pairs
+        it needs the result of, and returns whether the value is valid
+    :return: (callable) function that takes a value and returns whether it is valid
+    """
+    def check(val):
+        return _walk(check, walk, val)
+    _CONTAINERS[check] = walk
+    return check
+
+
+def _walk(check, walk, val):
+    """
+    Runs the walk of a value with an explicit stack, rather than by recursion, so the nesting of the value is only
+    bounded by memory. The verdict of every (container, checking function) pair is memoized for the duration of the
+    check, so a container shared by several parents is checked once, and a container that contains itself is
+    assumed valid where it repeats, so the check terminates.
+
+    :param check: (callable) the checking function
+    :param walk: (callable) the walk of the checking function, see _walked
+    :param val: (Any) the checked value
+    :return: (bool) whether the value is valid
+    """
+    memo = {(id(val), check): True}
+    alive = [val]  # the memoized containers are kept alive, so their ids are not reused during the check
+    stack = [(walk(val), (id(val), check))]
+    verdict = None
+    while stack:
+        generator, memo_key = stack[-1]
+        try:
+            elem_check, elem = generator.send(verdict)
+        except StopIteration as stop:
+            stack.pop()
+            verdict = bool(stop.value)
+            memo[memo_key] = verdict
+            continue
+        if elem_check not in _CONTAINERS:
+            verdict = elem_check(elem)
+            continue
+        elem_key = (id(elem), elem_check)
+        if elem_key in memo:
+            verdict = memo[elem_key]
+            continue
+        alive.append(elem)
+        elem_walk = _CONTAINERS[elem_check]
+        if elem_walk is None:
+            verdict = memo[elem_key] = elem_check(elem)
+            continue
+        memo[elem_key] = True
+        stack.append((elem_walk(elem), elem_key))
+        verdict = None
+    return verdict
+
+
+_type_only(_accept)
+_type_only(_is_none)
+_type_only(callable)
+_exact_types(_is_none, [type(None)])
+
 
 class _TypeCheckerMeta(type):
     """
@@ -14,7 +351,7 @@ class _TypeCheckerMeta(type):
     """
 
     @classmethod
-    def _check_type(mcs, key, val): #TODO: add the remainding typing objects (generator, ...)
+    def _check_type(mcs, key, val):
         """
         Checks whether a value is of a specific type.
 
@@ -22,53 +359,159 @@ class _TypeCheckerMeta(type):
         :param key: (Type or Typing object)
         :return: (bool) is of type
         """
-        if key == Any:
-            return True
-        elif type(key) == type(Union):
-            return any([mcs._check_type(k, val) for k in key.__args__])
-        elif isinstance(key, TypeVar):
-            return any([mcs._check_type(k, val) for k in key.__constraints__])
-        elif issubclass(key, List):
-            valid = isinstance(val, List)
-            if DEEP and valid and key.__args__ is not None:
-                return all([mcs._check_type(key.__args__[0], v) for v in val])
-            else:
-                return valid
-        elif issubclass(key, Set):
-            valid = isinstance(val, Set)
-            if DEEP and valid and key.__args__ is not None:
-                return all([mcs._check_type(key.__args__[0], v) for v in val])
-            else:
-                return valid
-        elif issubclass(key, Dict):
-            valid = isinstance(val, Dict)
-            if DEEP and valid and key.__args__ is not None:
-                return all([mcs._check_type(key.__args__[0], k) and
-                            mcs._check_type(key.__args__[1], v) for (k, v) in val.items()])
-            else:
-                return valid
-        elif issubclass(key, Tuple):
-            valid = isinstance(val, Tuple) and (key.__args__ is None or len(key.__args__) == len(val))
-            if DEEP and valid and  key.__args__ is not None:
-                return all([mcs._check_type(k, v) for k, v in zip(key.__args__, val)])
+        return mcs._compile(key, _current_deep(None))(val)
+
+    @classmethod
+    def _checker(mcs, key, sampling=None, deep=None):
+        """
+        Returns a checking function for a type, that follows the options of the context (see config.checking),
+        DEEP and SAMPLING at call.
+
+        :param key: (Type or Typing object)
+        :param sampling: (Sampling) overrides the sampling of the context and SAMPLING
+        :param deep: (bool) overrides the deep option of the context and DEEP
+        :return: (callable) function that takes a value and returns whether it is of type
+        """
+        shallow_check = mcs._compile(key, False)
+        deep_check = mcs._compile(key, True)
+        portable = _parallel_key(key)
+
+        def check(val):
+            # a single read of the context variable, the options are only resolved inside a checking context
+            options = _OPTIONS.get()
+            if options is None:
+                current_deep, current = DEEP, SAMPLING
+            elif options.enabled is False:
+                return True
             else:
+                current_deep = DEEP if options.deep is None else options.deep
+                current = SAMPLING if options.sampling is None else options.sampling
+            if not (current_deep if deep is None else deep):
+                return shallow_check(val)
+            if sampling is not None:
+                current = sampling
+            if current is None:
+                remember = validated.REMEMBER
+                if remember and validated._seen(deep_check, val):
+                    return True
+                valid = None
+                if portable is not None and parallel.PARALLEL is not None and type(val) in _SPLITTABLE:
+                    if not shallow_check(val):
+                        return False
+                    valid = parallel._container_all(portable, val)
+                if valid is None:
+                    valid = deep_check(val)
+                if remember and valid:
+                    validated._remember(deep_check, val)
                 return valid
-        elif type(key) == type(Callable): # will not do in depth checking, only shallow.
-            return callable(val)
-        elif issubclass(key, Mapping): # will not do in depth checking, only shallow.
-            return isinstance(val, map)
-        elif issubclass(key, Iterator): # will not do in depth checking, only shallow.
-            return isinstance(val, Iterator)
-        elif key == type(None) or key == None:
-            return val is None
-        elif val is None:
-            return False
-        else:
-            try:
-                return isinstance(val, key)
-            except Exception as ex: # pragma: no cover
-                print("Error: occured when comparing {} to class {}".format(val, key))
-                raise ex
+            return _run_sampled(mcs._compile(key, current), val, current).valid
+        return check
+
+    @classmethod
+    def _compile(mcs, key, deep):
+        """
+        Returns the checking function for a type, compiling it on first use.
+
+        :param key: (Type or Typing object)
+        :param deep: (bool or Sampling) whether the elements of containers are checked, a Sampling limits
+            the checked elements and must be run with _run_sampled
+        :return: (callable) function that takes a value and returns whether it is of type
+        """
+        try:
+            return _COMPILED[(key, deep)]
+        except KeyError:
+            check = mcs._build(key, deep)
+            _COMPILED[(key, deep)] = check
+            return check
+        except TypeError: # unhashable key, cannot be cached
+            return mcs._build(key, deep)
+
+    @classmethod
+    def _build(mcs, key, deep): #TODO: add the remainding typing objects (generator, ...)
+        """
+        Builds the checking function for a type, resolving the typing object once so that
+        the returned function does no introspection of its own.
+
+        :param key: (Type or Typing object)
+        :param deep: (bool or Sampling) see _compile
+        :return: (callable) function that takes a value and returns whether it is of type
+        """
+        if isinstance(key, ArraySpec):
+            return key._compile()
+        elif key == Any:
+            return _accept
+        elif _is_union(key):
+            return _any_of([mcs._compile(k, deep) for k in key.__args__])
+        elif isinstance(key, TypeVar):
+            if key.__constraints__:
+                return _any_of([mcs._compile(k, deep) for k in key.__constraints__])
+            elif key.__bound__ is not None:
+                return mcs._compile(key.__bound__, deep)
+            return _accept
+        elif key is None or key == type(None):
+            return _is_none
+        elif _protocol(key) is not None:
+            return _structural(_protocol(key))
+
+        cls, args = _generic_form(key)
+        if not isinstance(cls, type):
+            return _instance_of(key)
+        sampled = isinstance(deep, Sampling)
+        if cls in (list, set, frozenset):
+            return _sequence_of(cls, mcs._compile(args[0], deep) if deep and args else None, sampled, args)
+        elif cls is dict:
+            if deep and args:
+                return _dict_of(mcs._compile(args[0], deep), mcs._compile(args[1], deep), sampled, args)
+            return _dict_of(None, None)
+        elif cls is tuple:
+            if args and len(args) == 2 and args[1] is Ellipsis:
+                return _sequence_of(tuple, mcs._compile(args[0], deep) if deep else None, sampled)
+            elif args == ((),):
+                args = ()
+            return _tuple_of(args, [mcs._compile(k, deep) for k in args] if deep and args is not None else None)
+        elif cls is collections_abc.Callable: # will not do in depth checking, only shallow.
+            return callable
+        elif cls in _ABSTRACT_COLLECTIONS and args:
+            return _sequence_of(cls, mcs._compile(args[0], deep) if deep else None, sampled, args)
+        elif cls in (collections_abc.Mapping, collections_abc.MutableMapping) and args:
+            if deep:
+                return _dict_of(mcs._compile(args[0], deep), mcs._compile(args[1], deep), sampled, args, cls)
+            return _instance_of(cls)
+        elif cls is collections_abc.Mapping: # will not do in depth checking, only shallow.
+            return _instance_of(map)
+        elif cls is collections_abc.Iterable and args:
+            # only containers are deep checked, as iterating an iterator would consume it
+            return _iterable_of(mcs._compile(args[0], deep) if deep else None, sampled)
+        # the iterators and generators are checked as they are yielded (see _streamer), the parameterized generics
+        # cannot be used with isinstance: their class is checked (the collections.abc class of a typing generic)
+        return _instance_of(cls)
+
+    @classmethod
+    def _streamer(mcs, key, description, sampling=None, deep=None):
+        """
+        Returns a function that wraps the iterators and generators of an Iterator[], Iterable[] or Generator[]
+        annotation, so that their elements are checked as they are yielded, when deep checking.
+
+        :param key: (Type or Typing object)
+        :param description: (str) the checked value, used in the error messages
+        :param sampling: (Sampling) overrides the sampling of the context and SAMPLING for the elements
+        :param deep: (bool) overrides the deep option of the context and DEEP
+        :return: (callable) function that takes a value and returns it or its checking proxy,
+            None if key is not a parameterized Iterator, Iterable or Generator
+        """
+        cls, keys = _generic_form(key)
+        if deep is False or not keys or \
+                cls not in (collections_abc.Iterator, collections_abc.Iterable, collections_abc.Generator):
+            return None
+
+        checks = tuple(mcs._checker(k, sampling, deep) for k in keys)
+        proxy = _CheckedGenerator if cls is collections_abc.Generator else _CheckedIterator
+
+        def stream(val):
+            if not _current_deep(deep) or not isinstance(val, collections_abc.Iterator):
+                return val
+            return proxy(val, keys, checks, description)
+        return stream
 
     @classmethod
     def _validater(mcs, key):
@@ -78,23 +521,608 @@ class _TypeCheckerMeta(type):
         :param key: (Type or Typing object)
         :retrun: (callable) function that takes value and will raise an error if not valid
         """
+        type_check = mcs._checker(key)
+        site = violations._keyed_site((TypeChecker, key), TypeError,
+                                      lambda val, _: "Expected {}, got {}".format(key, val.__class__))
+
         def check(val):
             """
-            Checks that val is valid, will raise an error if not valid.
+            Checks that val is valid, will raise an error if not valid (or report it, see violations).
 
             :param val: (Any)
             """
-            if not mcs._check_type(key, val):
-                raise TypeError("Expected {}, got {}".format(key, val.__class__))
+            if not type_check(val):
+                site.fail(val)
         return check
 
     def __getitem__(mcs, key):
-        if isinstance(key, (Tuple, List, Set)):
+        if isinstance(key, (tuple, list, set)):
             return mcs._validater(Union[tuple(key)])
         else:
             return mcs._validater(key)
 
 
+def _parallel_key(key):
+    """
+    Returns the type of the chunks of the containers checked in parallel, see parallel.
+
+    :param key: (Type or Typing object)
+    :return: (Any) the type of the chunks, converted so it can be sent to the workers,
+        None if the values of the type are not checked in parallel
+    """
+    cls, args = _generic_form(key)
+    if not args:
+        return None
+    if cls in (set, frozenset):
+        key = List[args[0]]  # the elements of a set are sent as lists
+    elif not (cls in (list, dict) or (cls is tuple and len(args) == 2 and args[1] is Ellipsis)):
+        return None
+    return parallel._portable_key(key)
+
+
+def _any_of(checks):
+    """
+    Returns a checking function for a Union, or for the constraints of a TypeVar.
+
+    :param checks: ([callable]) the checking functions of the alternatives
+    :return: (callable) function that returns whether any of the checks passes
+    """
+    if len(checks) == 1:
+        return checks[0]
+    checks = tuple(checks)
+
+    if any(_CONTAINERS.get(alternative) is not None for alternative in checks):
+        def walk(val):
+            for alternative in checks:
+                if (yield alternative, val):
+                    return True
+            return False
+        return _walked(walk)
+
+    def check(val):
+        for alternative in checks:
+            if alternative(val):
+                return True
+        return False
+
+    if any(alternative in _NESTED for alternative in checks):
+        return _nested(check)
+    if any(alternative in _CONTAINERS for alternative in checks):
+        return _container(check)
+    exact = [cls for alternative in checks for cls in _EXACT_TYPES.get(alternative, ())]
+    if all(alternative in _TYPE_ONLY for alternative in checks):
+        return _exact_types(_type_cached(check, any(_TYPE_ONLY[alternative] for alternative in checks)), exact)
+    return _exact_types(check, exact)
+
+
+def _type_cached(check, abstract):
+    """
+    Returns a checking function that caches the results of check per type of value, in a bounded cache.
+
+    :param check: (callable) a checking function whose result only depends on the type of the value
+    :param abstract: (bool) whether check uses abstract classes, the cache is then cleared when
+        a subclass is registered to any abstract class. The changes of the classes are not detected,
+        see TypeChecker.invalidate
+    :return: (callable) function that returns whether a value is valid
+    """
+    verdicts = {}
+    cache_token = get_cache_token()
+
+    def cached_check(val):
+        nonlocal cache_token
+        if abstract and cache_token != get_cache_token():
+            verdicts.clear()
+            cache_token = get_cache_token()
+        try:
+            return verdicts[type(val)]
+        except KeyError:
+            verdict = check(val)
+            if len(verdicts) >= _TYPE_CACHE_SIZE:
+                verdicts.pop(next(iter(verdicts)), None)
+            verdicts[type(val)] = verdict
+            return verdict
+    _TYPE_CACHES[cached_check] = verdicts
+    return _type_only(cached_check, abstract)
+
+
+def _instance_of(cls):
+    """
+    Returns a checking function for a plain class.
+
+    :param cls: (type) the expected class, None is never an instance
+    :return: (callable) function that returns whether a value is an instance of cls
+    """
+    def check(val):
+        if val is None:
+            return False
+        try:
+            return isinstance(val, cls)
+        except Exception as ex: # pragma: no cover
+            print("Error: occured when comparing {} to class {}".format(val, cls))
+            raise ex
+
+    if isinstance(cls, ABCMeta):
+        # the instance checks of abstract classes are slow, and only depend on the type of the value
+        return _type_cached(check, True)
+    elif isinstance(cls, type) and type(cls).__instancecheck__ == type.__instancecheck__:
+        return _exact_types(_type_only(check), [cls] if cls is not type(None) else [])
+    return check
+
+
+def _is_union(key):
+    """
+    :param key: (Type or Typing object)
+    :return: (bool) whether key is a Union (or an Optional)
+    """
+    return type(key) == type(Union) or getattr(key, '__origin__', None) is Union
+
+
+def _generic_form(key):
+    """
+    Resolves a type into the class of its values and its type arguments, the same way on every python version:
+    the typing generics are classes whose __extra__ is the class of the values before python 3.7,
+    and aliases whose __origin__ is the class of the values since.
+
+    :param key: (Type or Typing object)
+    :return: (type, tuple) the class of the values (list for List[int], collections.abc.Sequence for Sequence[int],
+        Box for the user generic Box[int], the class itself for a class), and the type arguments,
+        None if the type is not parameterized
+    """
+    # the unparameterized typing generics hold type variables, or no arguments since python 3.9
+    args = None if getattr(key, '_special', False) else getattr(key, '__args__', None)
+    origin = key
+    while getattr(origin, '__origin__', None) is not None:
+        origin = origin.__origin__
+    if getattr(origin, '__module__', None) == 'typing' and getattr(origin, '__extra__', None) is not None:
+        return origin.__extra__, args
+    return origin, args
+
+
+def _protocol(key):
+    """
+    :param key: (Type or Typing object)
+    :return: (type) the protocol class of a typing.Protocol or typing_extensions.Protocol, parameterized or not,
+        None if key is not a protocol
+    """
+    while getattr(key, '__origin__', None) is not None:
+        key = key.__origin__
+    if isinstance(key, type) and key.__dict__.get('_is_protocol', False) and key.__name__ != 'Protocol':
+        return key
+    return None
+
+
+def _protocol_members(protocol):
+    """
+    :param protocol: (type) the protocol class
+    :return: ({str: bool}) the members of the protocol, mapped to whether they are methods
+    """
+    members = {}
+    for base in reversed(protocol.__mro__[:-1]):
+        if base.__name__ in ('Protocol', 'Generic'):
+            continue
+        for name in list(base.__dict__) + list(base.__dict__.get('__annotations__', {})):
+            if not name.startswith('_abc_') and name not in _PROTOCOL_INTERNALS:
+                members[name] = callable(base.__dict__.get(name))
+    return members
+
+
+def _structural(protocol):
+    """
+    Returns the checking function of a protocol, whose values have all the members of the protocol.
+    The members are resolved once, and the classes of the values are scanned once: the members found on the class
+    are not checked again, the others (such as the attributes set by __init__) are looked up on the values.
+    So a member added to a class later is found, but the changes of the classes are not detected: a member removed
+    from a class is only seen once TypeChecker.invalidate is called for it.
+
+    :param protocol: (type) the protocol class
+    :return: (callable) function that returns whether a value has the members of the protocol
+    """
+    members = _protocol_members(protocol)
+    verdicts = _PROTOCOLS.setdefault(protocol, {})
+
+    def scan(cls):
+        if protocol in cls.__mro__:
+            return ()
+        missing = []
+        for name, method in members.items():
+            for base in cls.__mro__:
+                if name in base.__dict__:
+                    if method and base.__dict__[name] is None:  # the method is explicitly not implemented
+                        return None
+                    break
+            else:
+                missing.append(name)
+        return tuple(missing)
+
+    def check(val):
+        if val is None:
+            return False
+        try:
+            missing = verdicts[type(val)]
+        except KeyError:
+            missing = scan(type(val))
+            if len(verdicts) >= _TYPE_CACHE_SIZE:
+                verdicts.pop(next(iter(verdicts)), None)
+            verdicts[type(val)] = missing
+        if not missing:
+            return missing is not None
+        return all(hasattr(val, name) for name in missing)
+    return check
+
+
+def _stays_valid(held):
+    """
+    Returns whether the values of a type cannot change so that they are no longer of the type, such as the instances
+    of a class, or the tuples of ints, but not the lists of ints, nor the instances of a protocol.
+
+    :param held: (Type or Typing object) the type of the values
+    :return: (bool)
+    """
+    if _is_union(held):
+        return all(_stays_valid(k) for k in held.__args__)
+    cls, args = _generic_form(held)
+    if args is None:
+        return isinstance(held, type) and _protocol(held) is None and \
+            type(held).__instancecheck__ in (type.__instancecheck__, ABCMeta.__instancecheck__)
+    return cls in (tuple, frozenset) and all(_stays_valid(arg) for arg in args if arg is not Ellipsis)
+
+
+def _covers(key, held):
+    """
+    Returns whether the values of a type are all valid for a key, and stay valid once checked.
+
+    :param key: (Type or Typing object) the checked type
+    :param held: (Type or Typing object) the type of the values
+    :return: (bool) False if it cannot be decided from the types only
+    """
+    if key == Any:
+        return True
+    elif not _stays_valid(held):  # the values could have changed since they were checked
+        return False
+    elif key == held:
+        return True
+    elif _is_union(key):
+        return any(_covers(k, held) for k in key.__args__)
+    elif getattr(key, '__args__', None) or getattr(held, '__args__', None):
+        return False
+    try:
+        return isinstance(key, type) and isinstance(held, type) and issubclass(held, key)
+    except TypeError:
+        return False
+
+
+def _holds(keys):
+    """
+    Returns a function telling whether the containers of a type guarantee the types of their elements,
+    such as the typed containers of runtime_check.containers, which check their elements as they are added.
+
+    :param keys: (tuple) the checked types of the elements
+    :return: (callable) function that takes the type of a container and returns whether its elements are valid
+    """
+    holds = {}
+
+    def check(cls):
+        try:
+            return holds[cls]
+        except KeyError:
+            element_keys = getattr(cls, '_element_keys', None)
+            holds[cls] = element_keys is not None and len(element_keys) == len(keys) and \
+                all(_covers(key, held) for key, held in zip(keys, element_keys))
+            return holds[cls]
+    return check
+
+
+def _homogeneous(val):
+    """
+    Checks whether the elements of a container all have the same type, and the same shape for arrays.
+
+    :param val: (Any)
+    :return: (bool) True for an array.array, a numpy array not of dtype object, a str or bytes, and a 0-d numpy
+        array that has no elements
+    """
+    return type(val) is array or isinstance(val, _TEXT) or (_is_array(val) and (val.dtype != object or not val.ndim))
+
+
+def _sample(val):
+    """
+    :param val: (Any) a homogeneous container, see _homogeneous
+    :return: (Any) a value of the type of all the elements, _MISSING for an empty array, _UNSIZED for a 0-d array
+    """
+    if isinstance(val, str):
+        return val[:1]  # the characters are strings, even those of an empty string
+    elif isinstance(val, _TEXT):
+        return 0
+    elif type(val) is not array and not val.ndim:
+        return _UNSIZED
+    return val[0] if len(val) else _MISSING
+
+
+def _sequence_of(cls, elem_check, sampled=False, keys=None):
+    """
+    Returns a checking function for a List, a Set or a homogeneous Tuple.
+
+    The elements are first scanned by their type, against the exact types valid for elem_check, and only
+    checked one by one if some type is not one of them. The elements of an array.array or of a numpy array
+    all have the same type, only the first one is checked.
+
+    :param cls: (type) the container class
+    :param elem_check: (callable) the check of every element, None for a shallow check
+    :param sampled: (bool) only check the elements selected by the budget of the running sampled check
+    :param keys: (tuple) the type of the elements, the containers that guarantee it are not iterated
+    :return: (callable) function that returns whether a value is a container of valid elements
+    """
+    if elem_check is None or elem_check is _accept:
+        return _type_only(lambda val: isinstance(val, cls), isinstance(cls, ABCMeta))
+    holds = _holds(keys) if keys else lambda container_cls: False
+    exact = _EXACT_TYPES.get(elem_check, frozenset())
+    is_exact = exact.__contains__
+    # arrays are neither lists, sets nor tuples
+    buffers = cls not in (list, set, tuple)
+
+    if _walks(elem_check):
+        def walk(val):
+            if not isinstance(val, cls):
+                return False
+            if holds(type(val)):
+                return True
+            if buffers and _homogeneous(val):
+                elem = _sample(val)
+                return elem is _MISSING or (elem is not _UNSIZED and (yield elem_check, elem))
+            for elem in _STATE.budget.select(val) if sampled else val:
+                if not (yield elem_check, elem):
+                    return False
+            return True
+        return _walked(walk)
+
+    if sampled:
+        def sampled_check(val):
+            if not isinstance(val, cls):
+                return False
+            if holds(type(val)):
+                return True
+            if buffers and _homogeneous(val):
+                elem = _sample(val)
+                return elem is _MISSING or (elem is not _UNSIZED and elem_check(elem))
+            for elem in _STATE.budget.select(val):
+                if not elem_check(elem):
+                    return False
+            return True
+        return _marked([elem_check])(sampled_check)
+
+    if elem_check in _CONTAINERS:
+        # the elements are containers, an element repeated in a row (as in [row] * n) is checked once
+        def nested_check(val):
+            if not isinstance(val, cls):
+                return False
+            if holds(type(val)):
+                return True
+            if buffers and _homogeneous(val):
+                elem = _sample(val)
+                return elem is _MISSING or (elem is not _UNSIZED and elem_check(elem))
+            previous = _MISSING
+            for elem in val:
+                if elem is not previous and not elem_check(elem):
+                    return False
+                previous = elem
+            return True
+        return _nested(nested_check)
+
+    def check(val):
+        if not isinstance(val, cls):
+            return False
+        if holds(type(val)):
+            return True
+        if buffers and _homogeneous(val):
+            elem = _sample(val)
+            return elem is _MISSING or (elem is not _UNSIZED and elem_check(elem))
+        if all(map(is_exact, map(type, val))):
+            return True
+        for elem in val:
+            if not (is_exact(type(elem)) or elem_check(elem)):
+                return False
+        return True
+    return _container(check)
+
+
+def _dict_of(key_check, val_check, sampled=False, keys=None, cls=dict):
+    """
+    Returns a checking function for a Dict, or a Mapping.
+
+    :param key_check: (callable) the check of every key, None for a shallow check
+    :param val_check: (callable) the check of every value, None for a shallow check
+    :param sampled: (bool) only check the items selected by the budget of the running sampled check
+    :param keys: (tuple) the type of the keys and of the values, the dicts that guarantee them are not iterated
+    :param cls: (type) the mapping class
+    :return: (callable) function that returns whether a value is a dict of valid items
+    """
+    if key_check is None or (key_check is _accept and val_check is _accept):
+        return _type_only(lambda val: isinstance(val, cls), isinstance(cls, ABCMeta))
+    holds = _holds(keys) if keys else lambda container_cls: False
+    # see _sequence_of, Any accepts every type
+    is_exact_key = _EXACT_TYPES.get(key_check, frozenset()).__contains__ if key_check is not _accept else _accept
+    is_exact_val = _EXACT_TYPES.get(val_check, frozenset()).__contains__ if val_check is not _accept else _accept
+
+    if _walks(key_check) or _walks(val_check):
+        def walk(val):
+            if not isinstance(val, cls):
+                return False
+            if holds(type(val)):
+                return True
+            for elem_key, elem_val in _STATE.budget.select(val.items()) if sampled else val.items():
+                if not ((yield key_check, elem_key) and (yield val_check, elem_val)):
+                    return False
+            return True
+        return _walked(walk)
+
+    if sampled:
+        def sampled_check(val):
+            if not isinstance(val, cls):
+                return False
+            if holds(type(val)):
+                return True
+            for elem_key, elem_val in _STATE.budget.select(val.items()):
+                if not (key_check(elem_key) and val_check(elem_val)):
+                    return False
+            return True
+        return _marked([key_check, val_check])(sampled_check)
+
+    def check(val):
+        if not isinstance(val, cls):
+            return False
+        if holds(type(val)):
+            return True
+        if all(map(is_exact_key, map(type, val))) and all(map(is_exact_val, map(type, val.values()))):
+            return True
+        for elem_key, elem_val in val.items():
+            if not (key_check(elem_key) and val_check(elem_val)):
+                return False
+        return True
+    return _marked([key_check, val_check])(check)
+
+
+def _iterable_of(elem_check, sampled=False):
+    """
+    Returns a checking function for an Iterable, only the elements of sized containers are checked.
+
+    :param elem_check: (callable) the check of every element, None for a shallow check
+    :param sampled: (bool) only check the elements selected by the budget of the running sampled check
+    :return: (callable) function that returns whether a value is an iterable of valid elements
+    """
+    is_iterable = _instance_of(collections_abc.Iterable)
+    if elem_check is None or elem_check is _accept:
+        return is_iterable
+    container_check = _sequence_of(collections_abc.Sized, elem_check, sampled)
+
+    if _CONTAINERS.get(container_check) is not None:
+        def walk(val):
+            if not is_iterable(val):
+                return False
+            elif isinstance(val, collections_abc.Iterator) or not isinstance(val, collections_abc.Sized):
+                return True
+            return (yield container_check, val)
+        return _walked(walk)
+
+    def check(val):
+        if not is_iterable(val):
+            return False
+        elif isinstance(val, collections_abc.Iterator) or not isinstance(val, collections_abc.Sized):
+            return True
+        return container_check(val)
+    return (_nested if container_check in _NESTED else _container)(check)
+
+
+class _CheckedIterator(collections_abc.Iterator):
+    """
+    Iterator proxy that checks every element as it is yielded, without buffering.
+
+    :param iterator: (Iterator) the wrapped iterator
+    :param keys: ((Type or Typing object,)) the type of the elements
+    :param checks: ((callable,)) the checking function of the elements
+    :param description: (str) the checked value, used in the error messages
+    """
+    __slots__ = ('_iterator', '_keys', '_checks', '_description')
+
+    def __init__(self, iterator, keys, checks, description):
+        self._iterator = iterator
+        self._keys = keys
+        self._checks = checks
+        self._description = description
+
+    def __next__(self):
+        val = next(self._iterator)
+        if not self._checks[0](val):
+            raise TypeError("Expected {} for an element of {}, got {}".format(self._keys[0], self._description,
+                                                                             val.__class__))
+        return val
+
+
+class _CheckedGenerator(_CheckedIterator, collections_abc.Generator):
+    """
+    Generator proxy that checks every yielded element, every sent value and the return value, without buffering.
+
+    :param iterator: (Generator) the wrapped generator
+    :param keys: ((Type or Typing object,)) the yield, send and return types
+    :param checks: ((callable,)) the checking function of the yield, send and return types
+    :param description: (str) the checked value, used in the error messages
+    """
+    __slots__ = ('_started',)
+
+    def __init__(self, iterator, keys, checks, description):
+        super().__init__(iterator, keys, checks, description)
+        self._started = False
+
+    def __next__(self):
+        return self._checked(self._iterator.__next__)
+
+    def send(self, value):
+        # the value that starts the generator is None, and is not received by the generator
+        if self._started and not self._checks[1](value):
+            raise TypeError("Expected {} for a value sent to {}, got {}".format(self._keys[1], self._description,
+                                                                               value.__class__))
+        return self._checked(self._iterator.send, value)
+
+    def throw(self, *args):
+        return self._checked(self._iterator.throw, *args)
+
+    def close(self):
+        self._iterator.close()
+
+    def _checked(self, method, *args):
+        """
+        Resumes the generator, and checks the yielded or the returned value.
+
+        :param method: (callable) the method of the generator
+        :return: (Any) the yielded value
+        """
+        self._started = True
+        try:
+            val = method(*args)
+        except StopIteration as stop:
+            if not self._checks[2](stop.value):
+                raise TypeError("Expected {} for the return of {}, got {}".format(
+                    self._keys[2], self._description, stop.value.__class__))
+            raise
+        if not self._checks[0](val):
+            raise TypeError("Expected {} for an element of {}, got {}".format(self._keys[0], self._description,
+                                                                             val.__class__))
+        return val
+
+
+def _tuple_of(args, elem_checks):
+    """
+    Returns a checking function for a fixed length Tuple.
+
+    :param args: (tuple) the expected types, None if the length is not fixed
+    :param elem_checks: ([callable]) the check of every element, None for a shallow check
+    :return: (callable) function that returns whether a value is a tuple of valid elements
+    """
+    if args is None:
+        return _type_only(lambda val: isinstance(val, tuple))
+    length = len(args)
+    if elem_checks is None:
+        return lambda val: isinstance(val, tuple) and len(val) == length
+    elem_checks = tuple(elem_checks)
+
+    if any(_walks(elem_check) for elem_check in elem_checks):
+        def walk(val):
+            if not isinstance(val, tuple) or len(val) != length:
+                return False
+            for elem_check, elem in zip(elem_checks, val):
+                if not (yield elem_check, elem):
+                    return False
+            return True
+        return _walked(walk)
+
+    def check(val):
+        if not isinstance(val, tuple) or len(val) != length:
+            return False
+        for elem_check, elem in zip(elem_checks, val):
+            if not elem_check(elem):
+                return False
+        return True
+    return _marked(elem_checks)(check)
+
+
 class TypeChecker(object, metaclass=_TypeCheckerMeta):
     """
     Class used to check whether a value is of a specific type.
@@ -105,6 +1133,8 @@ class TypeChecker(object, metaclass=_TypeCheckerMeta):
 
     you may use typing.Union[int, float] for mutliple valid types
     or List[int], Dict[str, int], Optional[int].
+    the protocols are checked structurally, and the verdict is cached per class: after a member is removed from
+    a class that was already checked, the cached verdict is stale until TypeChecker.invalidate(klass) is called.
     """
 
     @classmethod
@@ -119,11 +1149,83 @@ class TypeChecker(object, metaclass=_TypeCheckerMeta):
         """
         Checks whether val is a numpy array.
         """
-        cls._validater(np.ndarray)(val)
+        cls._validater(_numpy().ndarray)(val)
+
+    @classmethod
+    def report(cls, key, val, sampling=None):
+        """
+        Deep checks whether val is of type key, without raising an error.
+
+        :param key: (Type or Typing object)
+        :param val: (Any)
+        :param sampling: (Sampling) limits the checked elements, defaults to the sampling of the context,
+            SAMPLING or an exhaustive check
+        :return: (CheckResult) whether val is valid, and whether the check was exhaustive or sampled
+        """
+        if sampling is None:
+            options = _OPTIONS.get()
+            sampling = SAMPLING if options is None or options.sampling is None else options.sampling
+            if sampling is None:
+                sampling = _EXHAUSTIVE
+        return _run_sampled(cls._compile(key, sampling), val, sampling)
+
+    @classmethod
+    def invalidate(cls, klass=None):
+        """
+        Forgets the verdicts computed once per class, of the protocol checks and of the abstract class checks,
+        for a class whose attributes were changed. The changes of a class are not detected: a member removed from
+        a class that was already checked is only seen once the class is invalidated.
+
+        :param klass: (type) the changed class, None for all the classes
+        """
+        for verdicts in list(_PROTOCOLS.values()) + list(_TYPE_CACHES.values()):
+            if klass is None:
+                verdicts.clear()
+            else:
+                verdicts.pop(klass, None)
+
+    @classmethod
+    def validate_many(cls, key, values):
+        """
+        Checks whether every value of a batch is of type key, without raising an error.
+        The values of an array that is not of dtype object all have the same type, only the first one is checked,
+        and a 0-d array is a single value.
+
+        ex:
+            result = TypeChecker.validate_many(Dict[str, float], rows)
+            bad_rows = [rows[i] for i in result.failures]
+
+        :param key: (Type or Typing object) the type, a tuple, list or set of types for their Union
+        :param values: (Iterable) the values, the rows of an array
+        :return: (BatchResult) the mask of the valid values, the indices and the number of the invalid values,
+            as numpy arrays (numpy is imported on the first call)
+        """
+        if isinstance(key, (tuple, list, set)):
+            key = Union[tuple(key)]
+        # the options are resolved once for the batch
+        options = _OPTIONS.get() or _INHERITED
+        sampling = SAMPLING if options.sampling is None else options.sampling
+        if options.enabled is False:
+            check = _accept
+        elif not _current_deep(None):
+            check = cls._compile(key, False)
+        elif sampling is None:
+            check = cls._compile(key, True)
+        else:
+            sampled_check = cls._compile(key, sampling)
+            check = lambda val: _run_sampled(sampled_check, val, sampling).valid
+
+        np = _numpy()
+        if _is_array(values) and not values.ndim:
+            # a 0-d array is a single value, as in BoundChecker.validate_many
+            return _batch_result(np.full((), bool(check(values[()])), dtype=bool))
+        if _is_array(values) and values.dtype != object:
+            return _batch_result(np.full(len(values), len(values) > 0 and bool(check(values[0])), dtype=bool))
+        return _batch_result(np.fromiter((check(val) for val in values), dtype=bool))
 
     @classmethod
     def iterable(cls, val):
         """
         Checks whether val is an Iterable.
         """
-        cls._validater(Union[np.ndarray, Iterable])(val)
+        cls._validater(Iterable)(val)  # numpy arrays are Iterable
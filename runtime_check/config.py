@@ -0,0 +1,182 @@
+"""
+This module contains the check levels, used to disable or restrict the checks of the decorators,
+and the check options of the current context
+
+The level is read when a function is decorated:
+- 'off': the decorators return the function unchanged, there is no overhead.
+- 'shallow': the type of containers is checked, but not their elements.
+- 'deep': the elements of containers are checked, as with check_type.DEEP.
+- None: the decorators check, following check_type.DEEP at call.
+
+The levels can be set with the environment variable RUNTIME_CHECK_LEVEL, a comma separated list of a global level
+and of levels for modules or packages:
+    RUNTIME_CHECK_LEVEL=off,my_package.api=deep
+"""
+
+import os
+import threading
+from collections import namedtuple
+from typing import Dict  # pylint: disable=unused-import
+
+LEVELS = ('off', 'shallow', 'deep')
+
+_GLOBAL_LEVEL = None
+_MODULE_LEVELS = {}  # type: Dict[str, str]
+
+
+def set_level(level, module=None):
+    """
+    Sets the check level of the functions decorated afterwards.
+
+    :param level: (str) 'off', 'shallow', 'deep', or None to follow check_type.DEEP
+    :param module: (str) the name of the module or the package the level applies to, None for the global level
+    """
+    global _GLOBAL_LEVEL
+    if level is not None and level not in LEVELS:
+        raise ValueError("The check level can be one of {} or None, got {}".format(LEVELS, level))
+    if module is None:
+        _GLOBAL_LEVEL = level
+    elif level is None:
+        _MODULE_LEVELS.pop(module, None)
+    else:
+        _MODULE_LEVELS[module] = level
+
+
+def get_level(module=None):
+    """
+    Returns the check level of a module, the level of its closest package if it has none, else the global level.
+
+    :param module: (str) the name of the module
+    :return: (str) 'off', 'shallow', 'deep', or None to follow check_type.DEEP
+    """
+    while module:
+        if module in _MODULE_LEVELS:
+            return _MODULE_LEVELS[module]
+        module = module.rpartition('.')[0]
+    return _GLOBAL_LEVEL
+
+
+def _load_environment(value):
+    """
+    Sets the levels from the value of the RUNTIME_CHECK_LEVEL environment variable.
+
+    :param value: (str) a global level and levels of modules, ex: 'off,my_package.api=deep'
+    """
+    for entry in value.split(','):
+        entry = entry.strip()
+        if '=' in entry:
+            module, _, level = entry.partition('=')
+            set_level(level.strip(), module.strip())
+        elif entry:
+            set_level(entry)
+
+
+_load_environment(os.environ.get('RUNTIME_CHECK_LEVEL', ''))
+
+
+Options = namedtuple('Options', ['enabled', 'deep', 'sampling'])
+Options.__doc__ = """
+The check options of a context, a None option is inherited from the enclosing context,
+or from check_type.DEEP and check_type.SAMPLING.
+
+:param enabled: (bool) whether the checks are run
+:param deep: (bool) whether the elements of containers are type checked
+:param sampling: (Sampling) limits the elements checked in deep mode
+"""
+
+
+class _ThreadLocalVar(object):
+    """
+    Fallback of contextvars.ContextVar for python < 3.7, the value is local to a thread, not to an asyncio task.
+
+    :param name: (str) the name of the variable
+    :param default: (Any) the value of the variable when it was not set
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        # the default is a class attribute, so that reading an unset value does not raise an AttributeError
+        self._local = type('_Local', (threading.local,), {'value': default})()
+
+    def get(self):
+        """
+        :return: (Any) the value of the variable
+        """
+        return self._local.value
+
+    def set(self, value):
+        """
+        :param value: (Any) the new value of the variable
+        :return: (Any) the token used to restore the previous value
+        """
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):
+        """
+        :param token: (Any) the token returned by set
+        """
+        self._local.value = token
+
+
+def _context_var(name):
+    """
+    :param name: (str) the name of the variable
+    :return: (ContextVar or _ThreadLocalVar) a variable local to the context, defaulting to None
+    """
+    try:
+        from contextvars import ContextVar
+    except ImportError: # pragma: no cover
+        return _ThreadLocalVar(name, default=None)  # python < 3.7 without the contextvars backport
+    return ContextVar(name, default=None)
+
+
+# the options of the current context, None outside of the checking context manager
+_OPTIONS = _context_var('runtime_check_options')
+
+
+class _Checking(object):
+    """
+    Context manager returned by checking, see checking.
+
+    :param options: (Options) the options set in the context, None options are inherited
+    """
+    __slots__ = ('_options', '_tokens')
+
+    def __init__(self, options):
+        self._options = options
+        self._tokens = []
+
+    def __enter__(self):
+        current = _OPTIONS.get() or _INHERITED
+        enabled, deep, sampling = self._options
+        self._tokens.append(_OPTIONS.set(Options(current.enabled if enabled is None else enabled,
+                                                 current.deep if deep is None else deep,
+                                                 current.sampling if sampling is None else sampling)))
+        return self
+
+    def __exit__(self, *exc_info):
+        _OPTIONS.reset(self._tokens.pop())
+
+
+_INHERITED = Options(None, None, None)
+
+
+def checking(enabled=None, deep=None, sampling=None):
+    """
+    Context manager setting the check options of the current context (thread or asyncio task).
+    The options that are None are inherited from the enclosing context.
+    Before python 3.7, the options are only local to the thread: the asyncio tasks of a thread share them, so options
+    set around an await also apply to the other tasks that run meanwhile.
+
+    ex:
+        with checking(deep=True):
+            handle(untrusted_request)
+
+    :param enabled: (bool) whether the checks are run
+    :param deep: (bool) whether the elements of containers are type checked, overrides check_type.DEEP
+    :param sampling: (Sampling) limits the elements checked in deep mode, overrides check_type.SAMPLING
+    :return: (context manager)
+    """
+    return _Checking(Options(enabled, deep, sampling))
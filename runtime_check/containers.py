@@ -0,0 +1,305 @@
+"""
+This module contains containers that check their elements as they are added
+"""
+
+from abc import ABCMeta
+from typing import Dict, Tuple  # pylint: disable=unused-import
+
+from runtime_check.check_array import _is_array
+from runtime_check.check_bounds import BoundChecker
+from runtime_check.check_type import TypeChecker
+
+
+def _element_check(key, bounds, description):
+    """
+    Returns the check of the elements added to a typed container, the elements are always deep checked.
+
+    :param key: (Type or Typing object) the type of the elements
+    :param bounds: (tuples or [tuples]) the bounds of the elements, see BoundChecker, None for no bounds
+    :param description: (str) the checked element, used in the error messages
+    :return: (callable) function that takes an element and will raise an error if not valid
+    """
+    type_check = TypeChecker._compile(key, True)
+    in_bounds = BoundChecker._compile(bounds) if bounds is not None else None
+
+    def check(val):
+        if not type_check(val):
+            raise TypeError("Expected {} for {}, got {}".format(key, description, val.__class__))
+        if in_bounds is not None:
+            valid = in_bounds(val)
+            if not (valid.all() if _is_array(valid) else valid):
+                raise ValueError("Number out of bounds {} for {}, expected bounds {}".format(val, description, bounds))
+    return check
+
+
+def _rebuild(base, key, values):
+    """
+    Rebuilds a pickled typed container.
+
+    :param base: (type) TypedList, TypedDict or TypedSet
+    :param key: (tuple) the parameters of the container class
+    :param values: (list, dict or set) the elements
+    :return: (TypedList, TypedDict or TypedSet)
+    """
+    return base[key](values)
+
+
+class _TypedContainerMeta(ABCMeta):
+    """
+    Meta class used for the TypedList[] notation, creates the container class of the element types.
+    """
+
+    def __getitem__(cls, key):
+        if cls._checks is not None:
+            raise TypeError("{} is already parameterized".format(cls.__name__))
+        key = key if isinstance(key, tuple) else (key,)
+        arity = len(cls._descriptions)
+        if len(key) not in (arity, arity + 1):
+            raise TypeError("{} takes {} element type(s) and optional bounds, got {}".format(cls.__name__, arity, key))
+        try:
+            return cls._specialized[(cls, key)]
+        except KeyError:
+            pass
+        except TypeError: # unhashable bounds, cannot be cached
+            return cls._specialize(key)
+        # keyed on the exact class, the user subclasses share the dict of their base
+        cls._specialized[(cls, key)] = cls._specialize(key)
+        return cls._specialized[(cls, key)]
+
+    def _specialize(cls, key):
+        """
+        Creates the container class of the element types.
+
+        :param key: (tuple) the element types, followed by the optional bounds of the elements (or values)
+        :return: (type) the subclass of cls that checks the elements
+        """
+        arity = len(cls._descriptions)
+        keys = key[:arity]
+        bounds = key[arity] if len(key) > arity else None
+        name = "{}[{}]".format(cls.__name__, ", ".join(getattr(k, '__name__', None) or repr(k) for k in key))
+        # the bounds only apply to the values of a dict
+        checks = tuple(_element_check(k, bounds if i == arity - 1 else None, "{} of {}".format(description, name))
+                       for i, (k, description) in enumerate(zip(keys, cls._descriptions)))
+        return type(cls)(name, (cls,), {'__slots__': (), '__module__': cls.__module__, '_base': cls,
+                                        '_key': key, '_element_keys': keys, '_bounds': bounds, '_checks': checks})
+
+
+class TypedList(list, metaclass=_TypedContainerMeta):
+    """
+    A list that checks the type, and optionally the bounds, of the elements added to it.
+    Only the added elements are checked, every mutation costs the check of the new elements.
+
+    ex:
+        TypedList[int]([1, 2, 3])
+        TypedList[float, (0, 1)]()  # a list of probabilities
+
+    A TypedList of the checked type passes the deep checks of check_type_at_run without its elements being visited,
+    unless they can change once added, such as the lists of a TypedList[List[int]].
+    """
+    __slots__ = ()
+    _descriptions = ("an element",)
+    _specialized = {}  # type: Dict[Tuple[type, tuple], type]
+    _key = None
+    _element_keys = None
+    _bounds = None
+    _checks = None
+
+    def __init__(self, iterable=()):
+        if self._checks is None:
+            raise TypeError("{} must be parameterized, ex: {}[int]".format(type(self).__name__, type(self).__name__))
+        super().__init__(self._checked(iterable))
+
+    def _checked(self, iterable):
+        """
+        :param iterable: (Iterable) the added elements
+        :return: (Iterable) the elements, after checking them
+        """
+        if isinstance(iterable, type(self)):
+            return iterable
+        values = list(iterable)
+        check = self._checks[0]
+        for val in values:
+            check(val)
+        return values
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, list.__repr__(self))
+
+    def __reduce__(self):
+        return _rebuild, (self._base, self._key, list(self))
+
+    def __setitem__(self, index, val):
+        if isinstance(index, slice):
+            val = self._checked(val)
+        else:
+            self._checks[0](val)
+        list.__setitem__(self, index, val)
+
+    def __add__(self, other):
+        # the concatenation is a plain list, as for the other subclasses of list
+        return list.__add__(self, other)
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def append(self, val):
+        self._checks[0](val)
+        list.append(self, val)
+
+    def insert(self, index, val):
+        self._checks[0](val)
+        list.insert(self, index, val)
+
+    def extend(self, iterable):
+        list.extend(self, self._checked(iterable))
+
+    def copy(self):
+        return type(self)(self)
+
+
+class TypedSet(set, metaclass=_TypedContainerMeta):
+    """
+    A set that checks the type, and optionally the bounds, of the elements added to it.
+    Only the added elements are checked, every mutation costs the check of the new elements.
+
+    ex:
+        TypedSet[int]({1, 2, 3})
+
+    A TypedSet of the checked type passes the deep checks of check_type_at_run without its elements being visited.
+    """
+    __slots__ = ()
+    _descriptions = ("an element",)
+    _specialized = {}  # type: Dict[Tuple[type, tuple], type]
+    _key = None
+    _element_keys = None
+    _bounds = None
+    _checks = None
+
+    def __init__(self, iterable=()):
+        if self._checks is None:
+            raise TypeError("{} must be parameterized, ex: {}[int]".format(type(self).__name__, type(self).__name__))
+        super().__init__(self._checked(iterable))
+
+    _checked = TypedList._checked
+
+    def __reduce__(self):
+        return _rebuild, (self._base, self._key, set(self))
+
+    def __or__(self, other):
+        # the union is a plain set, as for the other subclasses of set
+        return set.__or__(self, other)
+
+    def __xor__(self, other):
+        return set.__xor__(self, other)
+
+    def __ior__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __ixor__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
+
+    def add(self, val):
+        self._checks[0](val)
+        set.add(self, val)
+
+    def update(self, *others):
+        set.update(self, *[self._checked(other) for other in others])
+
+    def symmetric_difference_update(self, other):
+        set.symmetric_difference_update(self, self._checked(other))
+
+    def copy(self):
+        return type(self)(self)
+
+
+class TypedDict(dict, metaclass=_TypedContainerMeta):
+    """
+    A dict that checks the type of the keys and of the values added to it, and optionally the bounds of the values.
+    Only the added items are checked, every mutation costs the check of the new items.
+
+    ex:
+        TypedDict[str, int]({"a": 1})
+        TypedDict[str, float, (0, 1)](a=0.5)  # a dict of probabilities
+
+    A TypedDict of the checked types passes the deep checks of check_type_at_run without its items being visited.
+    The mutable values are only checked when they are added.
+    """
+    __slots__ = ()
+    _descriptions = ("a key", "a value")
+    _specialized = {}  # type: Dict[Tuple[type, tuple], type]
+    _key = None
+    _element_keys = None
+    _bounds = None
+    _checks = None
+
+    def __init__(self, *args, **kwargs):
+        if self._checks is None:
+            raise TypeError("{} must be parameterized, ex: {}[str, int]".format(type(self).__name__,
+                                                                                 type(self).__name__))
+        super().__init__()
+        self.update(*args, **kwargs)
+
+    def _checked(self, items):
+        """
+        :param items: (Mapping or Iterable) the added items, as a mapping or as pairs
+        :return: (Mapping or Iterable) the items, after checking them
+        """
+        if isinstance(items, type(self)):
+            return items
+        if hasattr(items, 'keys'):
+            items = [(key, items[key]) for key in items.keys()]
+        else:
+            items = [tuple(item) for item in items]
+        check_key, check_value = self._checks
+        for item in items:
+            if len(item) != 2:
+                raise ValueError("Expected a (key, value) pair, got {}".format(item))
+            check_key(item[0])
+            check_value(item[1])
+        return items
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, dict.__repr__(self))
+
+    def __reduce__(self):
+        return _rebuild, (self._base, self._key, dict(self))
+
+    def __setitem__(self, key, val):
+        check_key, check_value = self._checks
+        check_key(key)
+        check_value(val)
+        dict.__setitem__(self, key, val)
+
+    def __or__(self, other):
+        # the union is a plain set, as for the other subclasses of set
+        return set.__or__(self, other)
+
+    def __xor__(self, other):
+        return set.__xor__(self, other)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        if len(args) > 1:
+            raise TypeError("update expected at most 1 arguments, got {}".format(len(args)))
+        if args:
+            dict.update(self, self._checked(args[0]))
+        if kwargs:
+            dict.update(self, self._checked(kwargs))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def copy(self):
+        return type(self)(self)
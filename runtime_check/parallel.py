@@ -0,0 +1,253 @@
+"""
+This module contains the parallel checks of large containers and arrays, split in chunks checked concurrently
+
+The parallel checks are opt-in, they are enabled by setting PARALLEL:
+    runtime_check.parallel.PARALLEL = Parallel(workers=32)
+
+The bound checks of numpy arrays, and the deep type checks of lists, tuples, sets and dicts, with at least
+threshold elements are then split in chunks:
+- the chunks of arrays are compared on a thread pool, as numpy releases the GIL during the comparisons.
+- the chunks of containers are checked on a process pool. Python objects cannot be placed in shared memory,
+  the chunks are pickled to the workers, so only the containers of costly elements gain from it.
+The pools are created on first use (concurrent.futures is only imported then), reused and shut down at exit, and the
+remaining chunks are cancelled at the first invalid chunk.
+The checks that cannot be run in parallel (types that cannot be sent to the workers, subclasses of the containers)
+are run as usual.
+"""
+
+import atexit
+import os
+import pickle
+from typing import Any, Dict  # pylint: disable=unused-import
+
+PARALLEL = None
+
+_POOLS = {}  # type: Dict[Any, Any]
+
+
+class Parallel(object):
+    """
+    Enables the parallel checks of large containers and arrays, see the module documentation.
+
+    ex:
+        runtime_check.parallel.PARALLEL = Parallel(workers=8, threshold=10**6)
+
+    :param workers: (int) the number of threads and of processes, defaults to the number of CPUs
+    :param threshold: (int) the minimal number of elements of a container or an array checked in parallel,
+        so that the small values never pay the dispatch to the pools
+    :param chunks: (int) the number of chunks a value is split in, defaults to 4 per worker
+    :param processes: (bool) whether the containers are checked on the process pool, else only arrays are
+        checked in parallel
+    """
+    __slots__ = ('workers', 'threshold', 'chunks', 'processes')
+
+    def __init__(self, workers=None, threshold=1000000, chunks=None, processes=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.chunks = chunks or 4 * self.workers
+        self.processes = processes
+
+    def __repr__(self):
+        return "Parallel(workers={}, threshold={}, chunks={}, processes={})".format(
+            self.workers, self.threshold, self.chunks, self.processes)
+
+
+def _pool(processes, workers):
+    """
+    Returns a pool, created on first use.
+    concurrent.futures is only imported then, as it is slow to import.
+
+    :param processes: (bool) a process pool, else a thread pool
+    :param workers: (int) the number of workers
+    :return: (Executor)
+    """
+    try:
+        return _POOLS[(processes, workers)]
+    except KeyError:
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        pool = _POOLS[(processes, workers)] = executor(workers)
+        return pool
+
+
+def _shutdown():
+    """
+    Shuts the pools down at exit, before concurrent.futures is cleared with the other modules.
+    """
+    for pool in list(_POOLS.values()):
+        pool.shutdown()
+    _POOLS.clear()
+
+
+atexit.register(_shutdown)
+
+
+def _split(size, count):
+    """
+    :param size: (int) the number of elements
+    :param count: (int) the number of chunks
+    :return: ([(int, int)]) the start and stop of every chunk
+    """
+    count = max(1, min(count, size))
+    return [(size * i // count, size * (i + 1) // count) for i in range(count)]
+
+
+def _all_valid(futures):
+    """
+    Waits for the results of the chunks, the remaining chunks are cancelled at the first invalid one.
+
+    :param futures: ([Future]) the checks of the chunks
+    :return: (bool) whether all the chunks are valid
+    """
+    from concurrent.futures import as_completed
+    try:
+        for future in as_completed(futures):
+            if not future.result():
+                return False
+        return True
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _array_chunks(val, parallel):
+    """
+    :param val: (numpy.ndarray) the array
+    :param parallel: (Parallel) the parallel options
+    :return: ([numpy.ndarray]) the chunks, as views of the array, None if it is too small to be checked in parallel
+    """
+    if val.size < parallel.threshold or val.ndim == 0:
+        return None
+    if val.flags.c_contiguous:
+        val = val.reshape(-1)
+    return [val[start:stop] for start, stop in _split(len(val), parallel.chunks)]
+
+
+def _array_all(check, val):
+    """
+    Checks the chunks of an array on the thread pool.
+
+    :param check: (callable) function that takes an array and returns the elementwise result
+    :param val: (numpy.ndarray) the array
+    :return: (bool) whether the check holds for all the elements, None if the array is not checked in parallel
+    """
+    parallel = PARALLEL
+    chunks = None if parallel is None else _array_chunks(val, parallel)
+    if chunks is None:
+        return None
+    pool = _pool(False, parallel.workers)
+    return _all_valid([pool.submit(lambda chunk: bool(check(chunk).all()), chunk) for chunk in chunks])
+
+
+def _array_map(check, val):
+    """
+    Runs an elementwise check on the chunks of an array, on the thread pool.
+
+    :param check: (callable) function that takes an array and returns the elementwise result
+    :param val: (numpy.ndarray) the array
+    :return: (numpy.ndarray) the elementwise result, None if the array is not checked in parallel
+    """
+    parallel = PARALLEL
+    chunks = None if parallel is None else _array_chunks(val, parallel)
+    if chunks is None:
+        return None
+    from runtime_check.check_array import _numpy
+    np = _numpy()
+    results = list(_pool(False, parallel.workers).map(check, chunks))
+    return np.concatenate([np.asarray(result, dtype=bool) for result in results], axis=0).reshape(val.shape)
+
+
+def _portable(key):
+    """
+    Converts a type into a value that can be pickled, as the typing objects of python 3.6 cannot be.
+
+    :param key: (Type or Typing object) the type
+    :return: (Any) the type, or a (origin, args) tuple for the parameterized typing objects of python 3.6
+    """
+    origin = getattr(key, '__origin__', None)
+    args = getattr(key, '__args__', None)
+    try:
+        pickled = pickle.loads(pickle.dumps(key)) == key
+    except Exception:  # pylint: disable=broad-except
+        pickled = False
+    if pickled:
+        return key
+    elif origin is None or not args:
+        raise TypeError("The type {} cannot be sent to the workers".format(key))
+    portable = (_portable(origin), tuple(_portable(arg) for arg in args))
+    if _restore(portable) != key:
+        raise TypeError("The type {} cannot be sent to the workers".format(key))
+    return portable
+
+
+def _restore(portable):
+    """
+    :param portable: (Any) a type converted by _portable
+    :return: (Type or Typing object) the type
+    """
+    if isinstance(portable, tuple):
+        origin, args = portable
+        return _restore(origin)[tuple(_restore(arg) for arg in args)]
+    return portable
+
+
+def _portable_key(key):
+    """
+    :param key: (Type or Typing object) the type of the containers checked by the workers
+    :return: (Any) the type converted by _portable, None if it cannot be sent to the workers
+    """
+    try:
+        return _portable(key)
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+
+def _check_chunk(payload):
+    """
+    Checks a chunk of a container, in a worker process.
+
+    :param payload: (bytes) the pickled type of the container (converted by _portable), the elements of the chunk
+        (list or tuple) and whether they are the items of a dict
+    :return: (bool) whether the chunk is valid
+    """
+    from runtime_check.check_type import TypeChecker
+    portable, chunk, items = pickle.loads(payload)
+    return TypeChecker._compile(_restore(portable), True)(dict(chunk) if items else chunk)
+
+
+def _container_all(portable, val):
+    """
+    Checks the chunks of a list, a tuple, a set or a dict on the process pool.
+
+    :param portable: (Any) the type of the container converted by _portable_key, a List for sets
+    :param val: (list, tuple, set, frozenset or dict) the container, of the checked type
+    :return: (bool) whether all the elements are valid, None if the container is not checked in parallel
+    """
+    parallel = PARALLEL
+    if parallel is None or not parallel.processes or len(val) < parallel.threshold:
+        return None
+    items = isinstance(val, dict)
+    if items:
+        val = list(val.items())
+    elif isinstance(val, (set, frozenset)):
+        val = list(val)
+    pool = _pool(True, parallel.workers)
+    futures = []
+    try:
+        for start, stop in _split(len(val), parallel.chunks):
+            # pickled here, so that the elements that cannot be sent to the workers fail before the submission
+            payload = pickle.dumps((portable, val[start:stop], items), pickle.HIGHEST_PROTOCOL)
+            futures.append(pool.submit(_check_chunk, payload))
+    except Exception:  # pylint: disable=broad-except
+        for future in futures:
+            future.cancel()
+        return None
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        return _all_valid(futures)
+    except BrokenProcessPool:
+        _POOLS.pop((True, parallel.workers), None)
+        return None
+    except Exception:  # pylint: disable=broad-except
+        # such as the classes defined after the workers were started, the chunk is then checked as usual
+        return None
@@ -0,0 +1,153 @@
+"""
+This module contains the profiling of the decorated functions, used to measure the overhead of the checks
+
+The functions decorated while PROFILE is set record, per call, the time spent in the checks of the arguments,
+in the function and in the check of the return value, and the number of failed checks.
+PROFILE is set by default with the environment variable RUNTIME_CHECK_PROFILE=1.
+"""
+
+import json
+import os
+import time
+from array import array
+
+
+def _perf_counter_ns():  # pragma: no cover
+    """
+    perf_counter in nanoseconds, for python < 3.7
+    """
+    return int(time.perf_counter() * 1e9)
+
+
+perf_counter_ns = getattr(time, 'perf_counter_ns', _perf_counter_ns)
+
+PROFILE = os.environ.get('RUNTIME_CHECK_PROFILE', '') not in ('', '0')
+SAMPLES = 1024
+PERCENTILES = (50, 90, 99)
+
+_PROFILED = []
+
+
+class FunctionStats(object):
+    """
+    The statistics of a profiled function, the durations of the last SAMPLES calls are kept for the percentiles.
+
+    :param name: (str) the qualified name of the function
+    """
+    __slots__ = ('name', 'calls', 'pre_failures', 'post_failures', 'pre_total', 'body_total', 'post_total',
+                 'pre_samples', 'body_samples', 'post_samples')
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the statistics.
+        """
+        self.calls = 0
+        self.pre_failures = 0
+        self.post_failures = 0
+        self.pre_total = 0
+        self.body_total = 0
+        self.post_total = 0
+        self.pre_samples = array('q', bytes(8 * SAMPLES))
+        self.body_samples = array('q', bytes(8 * SAMPLES))
+        self.post_samples = array('q', bytes(8 * SAMPLES))
+
+    def record(self, start, checked, called, end):
+        """
+        Records a call, from the clock readings between its phases.
+
+        :param start: (int) the time in ns before the checks of the arguments
+        :param checked: (int) the time in ns before the call of the function
+        :param called: (int) the time in ns before the check of the return value
+        :param end: (int) the time in ns after the check of the return value
+        """
+        index = self.calls % SAMPLES
+        self.calls += 1
+        self.pre_samples[index] = checked - start
+        self.body_samples[index] = called - checked
+        self.post_samples[index] = end - called
+        self.pre_total += checked - start
+        self.body_total += called - checked
+        self.post_total += end - called
+
+    def summary(self):
+        """
+        :return: (dict) the statistics, with the total, mean and percentiles in ns of every phase
+        """
+        summary = {'name': self.name, 'calls': self.calls, 'pre_failures': self.pre_failures,
+                   'post_failures': self.post_failures}
+        count = min(self.calls, SAMPLES)
+        for phase, total, samples in [('pre', self.pre_total, self.pre_samples),
+                                      ('body', self.body_total, self.body_samples),
+                                      ('post', self.post_total, self.post_samples)]:
+            ordered = sorted(samples[:count])
+            summary[phase] = {'total_ns': total, 'mean_ns': total / self.calls if self.calls else 0.0}
+            for percentile in PERCENTILES:
+                summary[phase]['p{}_ns'.format(percentile)] = \
+                    ordered[min(count - 1, count * percentile // 100)] if count else 0
+        overhead = self.pre_total + self.post_total
+        summary['overhead_ns'] = overhead
+        summary['overhead_share'] = overhead / (overhead + self.body_total) if overhead + self.body_total else 0.0
+        return summary
+
+
+def _register(name):
+    """
+    Returns the statistics of a new profiled function.
+
+    :param name: (str) the qualified name of the function
+    :return: (FunctionStats)
+    """
+    function_stats = FunctionStats(name)
+    _PROFILED.append(function_stats)
+    return function_stats
+
+
+def stats(sort_by='overhead_ns'):
+    """
+    Returns the statistics of the profiled functions.
+
+    :param sort_by: (str) the key of the summaries used to sort them, in decreasing order
+    :return: ([dict]) the summary of every profiled function, see FunctionStats.summary
+    """
+    return sorted([function_stats.summary() for function_stats in _PROFILED], key=lambda summary: summary[sort_by],
+                  reverse=True)
+
+
+def stats_table(sort_by='overhead_ns'):
+    """
+    Returns the statistics of the profiled functions as a table.
+
+    :param sort_by: (str) the key of the summaries used to sort them, in decreasing order
+    :return: (str) the table, with the times in microseconds
+    """
+    lines = ["{:<40}{:>10}{:>10}{:>12}{:>12}{:>12}{:>12}{:>10}".format(
+        "function", "calls", "failures", "pre mean", "pre p99", "post mean", "body mean", "overhead")]
+    for summary in stats(sort_by):
+        lines.append("{:<40}{:>10}{:>10}{:>12.2f}{:>12.2f}{:>12.2f}{:>12.2f}{:>9.1f}%".format(
+            summary['name'][-40:], summary['calls'], summary['pre_failures'] + summary['post_failures'],
+            summary['pre']['mean_ns'] / 1e3, summary['pre']['p99_ns'] / 1e3, summary['post']['mean_ns'] / 1e3,
+            summary['body']['mean_ns'] / 1e3, summary['overhead_share'] * 100))
+    return "\n".join(lines)
+
+
+def stats_json(sort_by='overhead_ns', **kwargs):
+    """
+    Returns the statistics of the profiled functions as JSON.
+
+    :param sort_by: (str) the key of the summaries used to sort them, in decreasing order
+    :param kwargs: the arguments of json.dumps
+    :return: (str) the JSON list of summaries
+    """
+    return json.dumps(stats(sort_by), **kwargs)
+
+
+def reset_stats():
+    """
+    Clears the statistics of all the profiled functions.
+    """
+    for function_stats in _PROFILED:
+        function_stats.reset()
@@ -0,0 +1,170 @@
+"""
+This module is used for the validation of tabular batches, column by column
+
+numpy is imported on the first use of a Schema, as for an ArraySpec.
+"""
+
+from collections import namedtuple
+
+from runtime_check import parallel
+from runtime_check.check_array import ArraySpec, _numpy, _is_array
+from runtime_check.check_bounds import BoundChecker
+from runtime_check.config import _OPTIONS
+
+SchemaResult = namedtuple('SchemaResult', ['valid', 'failures', 'count', 'columns', 'errors'])
+SchemaResult.__doc__ = """
+The result of the validation of a batch by a Schema.
+
+:param valid: (numpy.ndarray) the mask of the valid rows
+:param failures: (numpy.ndarray) the indices of the invalid rows
+:param count: (int) the number of invalid rows
+:param columns: ({str: numpy.ndarray}) the indices of the invalid rows of every column that has some
+:param errors: ({str: str}) the columns that are missing, or whose dtype or shape is not valid, all their rows are
+    invalid
+"""
+
+
+class Schema(object):
+    """
+    Specification of the columns of a tabular batch: a numpy structured array, a record array or a dict of 1-D arrays.
+    Every column is checked at once: its dtype from the array header, and its bounds with a vectorized comparison.
+
+    ex:
+        Schema({'id': numpy.int64, 'score': (numpy.floating, (0, 1)), 'age': (None, [(0, 150)])})
+
+    :param columns: (Mapping or [(str, Any)]) the columns, mapped to their dtype (see ArraySpec), or to a
+        (dtype, bounds) tuple (see BoundChecker), None for any dtype or no bounds
+
+    The columns that are not in the schema are not checked.
+    The schema can be called as a checking function (such as in enforce_annotations), that raises an error at the
+    first invalid column, or validate reports the invalid rows of every column.
+    """
+    __slots__ = ('columns', '_checks')
+
+    def __init__(self, columns):
+        self.columns = []
+        self._checks = []
+        for name, spec in (columns.items() if hasattr(columns, 'items') else columns):
+            dtype, bounds = spec if isinstance(spec, tuple) else (spec, None)
+            self.columns.append((name, dtype, bounds))
+            self._checks.append((name, ArraySpec(dtype, (None,)), bounds,
+                                 None if bounds is None else BoundChecker._compile(bounds)))
+
+    def __repr__(self):
+        return "Schema({{{}}})".format(", ".join("{!r}: ({}, {})".format(name, dtype, bounds)
+                                                 for name, dtype, bounds in self.columns))
+
+    def __call__(self, batch):
+        """
+        Checks that the batch is valid, will raise an error at the first invalid column.
+
+        :param batch: (numpy.ndarray or {str: numpy.ndarray}) the batch
+        """
+        options = _OPTIONS.get()
+        if options is not None and options.enabled is False:
+            return
+        np = _numpy()
+        columns, size = self._split(batch)
+        for name, spec, bounds, in_bounds in self._checks:
+            error = self._header_error(columns, name, spec, size)
+            if error is not None:
+                raise TypeError("{} for column {}".format(error, name))
+            if in_bounds is None:
+                continue
+            column = columns[name]
+            try:
+                if parallel.PARALLEL is not None and parallel._array_all(in_bounds, column):
+                    continue
+                valid = in_bounds(column)
+            except TypeError as error:  # an array that is not of numbers
+                raise TypeError("{} for column {}".format(error, name))
+            if not valid.all():
+                row = int(np.argmin(valid))
+                raise ValueError("Number out of bounds {} at row {} for column {}, expected bounds {} "
+                                 "({} invalid rows)".format(column[row], row, name, bounds,
+                                                            valid.size - np.count_nonzero(valid)))
+
+    @staticmethod
+    def _split(batch):
+        """
+        :param batch: (numpy.ndarray or {str: numpy.ndarray}) the batch
+        :return: ({str: Any}, int) the columns of the batch, and its number of rows
+        """
+        if _is_array(batch) and batch.dtype.names is not None:
+            if batch.ndim != 1:
+                raise TypeError("Expected a 1-D structured array, got the shape {}".format(batch.shape))
+            return {name: batch[name] for name in batch.dtype.names}, len(batch)
+        elif hasattr(batch, 'keys'):
+            columns = {name: batch[name] for name in batch.keys()}
+            sizes = [len(column) for column in columns.values() if _is_array(column) and column.ndim == 1]
+            return columns, sizes[0] if sizes else 0
+        raise TypeError("Expected a structured array, a record array or a dict of arrays, got {}"
+                        .format(batch.__class__))
+
+    @staticmethod
+    def _header_error(columns, name, spec, size):
+        """
+        Checks a column from its array header.
+
+        :param columns: ({str: Any}) the columns of the batch
+        :param name: (str) the name of the column
+        :param spec: (ArraySpec) the spec of the column
+        :param size: (int) the number of rows of the batch
+        :return: (str) the description of the error, None if the column is valid
+        """
+        if name not in columns:
+            return "Missing column"
+        column = columns[name]
+        if not spec._check(column):
+            return "Expected {}, got {}".format(spec, "an array of {} with the shape {}".format(
+                column.dtype, column.shape) if _is_array(column) else column.__class__)
+        if len(column) != size:
+            return "Expected {} rows, got {}".format(size, len(column))
+        return None
+
+    def validate(self, batch):
+        """
+        Checks every row of a batch, without raising an error for the invalid rows.
+
+        ex:
+            result = schema.validate(batch)
+            for name, rows in result.columns.items():
+                print(name, "is invalid at the rows", rows)
+            clean = batch[result.valid]
+
+        :param batch: (numpy.ndarray or {str: numpy.ndarray}) a structured array, a record array or a dict of
+            1-D arrays of the same length
+        :return: (SchemaResult) the mask of the valid rows, the indices and the number of the invalid rows,
+            and the invalid rows of every column
+        """
+        np = _numpy()
+        columns, size = self._split(batch)
+        valid = np.ones(size, dtype=bool)
+        options = _OPTIONS.get()
+        if options is not None and options.enabled is False:
+            return SchemaResult(valid, np.flatnonzero(~valid), 0, {}, {})
+
+        failures = {}
+        errors = {}
+        for name, spec, _, in_bounds in self._checks:
+            error = self._header_error(columns, name, spec, size)
+            if error is not None:
+                errors[name] = error
+            elif in_bounds is not None:
+                column = columns[name]
+                try:
+                    column_valid = parallel._array_map(in_bounds, column) if parallel.PARALLEL is not None else None
+                    column_valid = np.asarray(in_bounds(column) if column_valid is None else column_valid, dtype=bool)
+                except TypeError as error:  # an array that is not of numbers
+                    errors[name] = str(error)
+                else:
+                    rows = np.flatnonzero(~column_valid)
+                    if len(rows):
+                        failures[name] = rows
+                        valid &= column_valid
+            if name in errors:
+                failures[name] = np.arange(size)
+                valid[:] = False
+
+        invalid = np.flatnonzero(~valid)
+        return SchemaResult(valid, invalid, len(invalid), failures, errors)
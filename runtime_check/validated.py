@@ -0,0 +1,89 @@
+"""
+This module contains the registry of the values that passed a check, so that the immutable values passed along a
+chain of decorated functions are only checked once
+
+The registry is opt-in, it is enabled by setting REMEMBER:
+    runtime_check.validated.REMEMBER = True
+
+The deep type checks and the bound checks of arrays then record the values that passed them, by identity and
+compiled check, and skip the values already recorded. Only the values that cannot change are recorded:
+- the tuples and frozensets of at least MIN_LENGTH elements that are hashable, so they hold no mutable container.
+- the numpy arrays of at least MIN_LENGTH elements that are read-only, as well as the arrays they are views of,
+  and that are over bytes, such as numpy.frombuffer(data). An array that owns its data is not recorded even if
+  read-only: it can be made writeable, changed and made read-only again, which cannot be detected.
+The registry holds the last CACHE_SIZE recorded values, kept alive so that their identity is not reused.
+"""
+
+from typing import Any, Callable, Dict, Tuple  # pylint: disable=unused-import
+
+from runtime_check.check_array import _is_array
+
+REMEMBER = False
+CACHE_SIZE = 1024
+MIN_LENGTH = 8
+
+_VALIDATED = {}  # type: Dict[Tuple[int, Callable], Any]
+
+
+def _frozen(val):
+    """
+    :param val: (Any) a valid value
+    :return: (bool) whether the value cannot change, so that it stays valid
+    """
+    if isinstance(val, (tuple, frozenset)):
+        if type(val) not in (tuple, frozenset) or len(val) < MIN_LENGTH:
+            return False
+        try:
+            hash(val)
+        except TypeError:  # holds a mutable container
+            return False
+        return True
+    return _is_array(val) and val.size >= MIN_LENGTH and _read_only(val)
+
+
+def _read_only(val):
+    """
+    :param val: (numpy.ndarray) an array
+    :return: (bool) whether the data of the array cannot be written, through it or the arrays it is a view of,
+        and cannot become writeable again
+    """
+    while _is_array(val):
+        if val.flags.writeable:
+            return False
+        val = val.base
+    return isinstance(val, bytes)
+
+
+def _seen(check, val):
+    """
+    :param check: (callable) the compiled check
+    :param val: (Any) the checked value
+    :return: (bool) whether the value already passed the check, and did not change since
+    """
+    if _VALIDATED.get((id(val), check)) is not val:
+        return False
+    return not _is_array(val) or _read_only(val)
+
+
+def _remember(check, val):
+    """
+    Records a value that passed a check, if it cannot change.
+
+    :param check: (callable) the compiled check
+    :param val: (Any) the valid value
+    """
+    if not _frozen(val):
+        return
+    while len(_VALIDATED) >= CACHE_SIZE:
+        try:
+            _VALIDATED.pop(next(iter(_VALIDATED)))
+        except (KeyError, StopIteration, RuntimeError):  # emptied or changed by another thread
+            break
+    _VALIDATED[(id(val), check)] = val
+
+
+def clear():
+    """
+    Clears the registry of the validated values.
+    """
+    _VALIDATED.clear()
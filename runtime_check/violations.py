@@ -0,0 +1,174 @@
+"""
+This module contains the handling of the failed checks, that raise an error by default, or are reported to a handler
+
+The reporting is opt-in, it is enabled by setting HANDLER:
+    runtime_check.violations.HANDLER = runtime_check.violations.warn
+
+The failed checks of the decorators and of the TypeChecker and BoundChecker validators then do not raise an error,
+the checked value is used as is. Every check is a site, with its own counter: a failure only increments it and keeps
+the value as a sample, and the handler is called at most once per INTERVAL seconds per site, with the number of
+failures since the last report. The message of the error is only formatted if the handler reads it.
+flush reports the failures that were counted since the last report of every site.
+The reported failures are seen by the call sampling (the next calls are all checked) and by the profiling, as the
+raised ones.
+"""
+
+import sys
+import threading
+import warnings
+import weakref
+from time import monotonic
+from typing import Any, Dict  # pylint: disable=unused-import
+
+HANDLER = None
+INTERVAL = 10.0  # the minimal time in seconds between two reports of a site
+
+_SITES = weakref.WeakSet()  # type: weakref.WeakSet[_Site]
+# the sites shared by the checks compiled for the same key, such as the validators made inline
+_KEYED_SITES = {}  # type: Dict[Any, _Site]
+
+
+class _Failures(threading.local):
+    """
+    The number of failures reported in the current thread, read by the sampled and the profiled wrappers around
+    their checks, as the reported failures do not raise.
+    """
+    count = 0
+
+
+_FAILURES = _Failures()
+
+
+class Violation(object):
+    """
+    The report of the failed checks of a site, given to the handler.
+
+    :param error: (type) the error raised without a handler, TypeError or ValueError
+    :param count: (int) the number of failures since the last report
+    :param total: (int) the number of failures of the site, including this report
+    :param sample: (Any) the value of the last failure
+    """
+    __slots__ = ('error', 'count', 'total', 'sample', '_message', '_detail')
+
+    def __init__(self, error, count, total, sample, message, detail=None):
+        self.error = error
+        self.count = count
+        self.total = total
+        self.sample = sample
+        self._message = message
+        self._detail = detail
+
+    def __repr__(self):
+        return "Violation(error={}, count={}, total={})".format(self.error.__name__, self.count, self.total)
+
+    @property
+    def message(self):
+        """
+        :return: (str) the message of the error of the last failure, formatted on access
+        """
+        return self._message(self.sample, self._detail)
+
+
+class _Site(object):
+    """
+    The failure state of a check, preallocated when the check is compiled.
+
+    :param error: (type) the error raised without a handler
+    :param message: (callable) takes the value and the detail of a failure, returns the message of the error
+    """
+    __slots__ = ('error', 'message', 'count', 'total', 'sample', 'detail', 'next_report', '__weakref__')
+
+    def __init__(self, error, message):
+        self.error = error
+        self.message = message
+        self.count = 0
+        self.total = 0
+        self.sample = None
+        self.detail = None
+        self.next_report = 0.0
+        _SITES.add(self)
+
+    def fail(self, val, detail=None):
+        """
+        Raises the error of a failed check, or counts it and reports to the handler if the interval elapsed.
+
+        :param val: (Any) the invalid value
+        :param detail: (Any) passed to the formatting of the message, such as the mask of the valid elements
+        """
+        handler = HANDLER
+        if handler is None:
+            raise self.error(self.message(val, detail))
+        _FAILURES.count += 1
+        self.count += 1
+        self.sample = val
+        self.detail = detail
+        now = monotonic()
+        if now >= self.next_report:
+            self.next_report = now + INTERVAL
+            self.report(handler)
+
+    def report(self, handler):
+        """
+        Calls the handler with the failures counted since the last report.
+
+        :param handler: (callable) takes a Violation
+        """
+        count, self.count = self.count, 0
+        self.total += count
+        sample, detail, self.sample, self.detail = self.sample, self.detail, None, None
+        handler(Violation(self.error, count, self.total, sample, self.message, detail))
+
+
+def _keyed_site(key, error, message):
+    """
+    Returns the site of the checks of a key, created on first use, so that the checks made again for the same key
+    (such as TypeChecker[int](val) in a loop) share their rate limit.
+
+    :param key: (Any) the key of the check, such as its type or its bounds
+    :param error: (type) the error raised without a handler
+    :param message: (callable) see _Site
+    :return: (_Site)
+    """
+    try:
+        return _KEYED_SITES[key]
+    except KeyError:
+        site = _KEYED_SITES[key] = _Site(error, message)
+        return site
+    except TypeError:  # unhashable key, such as a list of bounds
+        return _keyed_site(repr(key), error, message)
+
+
+def flush():
+    """
+    Reports the failures counted since the last report of every site, for instance before the program exits.
+    """
+    handler = HANDLER
+    if handler is None:
+        return
+    for site in list(_SITES):
+        if site.count:
+            site.report(handler)
+
+
+def _stacklevel():
+    """
+    :return: (int) the stack level of the first caller outside of the library and of the decorated wrappers,
+        relative to the caller of _stacklevel
+    """
+    level = 1
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame is not None and (frame.f_globals.get('__name__', '').startswith('runtime_check.') or
+                                 '__rc_func__' in frame.f_code.co_freevars):
+        frame = frame.f_back
+        level += 1
+    return level
+
+
+def warn(violation):
+    """
+    Handler issuing a RuntimeWarning for the failures of a site, at the caller of the checked function.
+
+    :param violation: (Violation) the report of the failures
+    """
+    warnings.warn("{} ({} failures since the last report, {} in total)".format(
+        violation.message, violation.count, violation.total), RuntimeWarning, stacklevel=_stacklevel())
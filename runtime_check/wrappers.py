@@ -2,24 +2,285 @@
 This module containes the wrappers used in the library
 """
 
-from inspect import signature
+import inspect
+from inspect import signature, Parameter, iscoroutinefunction
+from keyword import iskeyword
+import sys
+import typing
 from collections import Iterable
-from functools import wraps
+from functools import wraps, partial
+from typing import Any, Union, ClassVar
 
-from runtime_check.check_bounds import BoundChecker
-from runtime_check.check_type import TypeChecker
+from runtime_check import config, profiling, violations
+from runtime_check.call_sampling import CallSampler
+from runtime_check.check_array import ArraySpec, _is_array
+from runtime_check.check_bounds import BoundChecker, _check_bounds, _out_of_bounds, _not_number
+from runtime_check.check_type import TypeChecker, _is_union
+from runtime_check.config import _OPTIONS
 
+# python 3.5 has no async generators
+_isasyncgenfunction = getattr(inspect, 'isasyncgenfunction', None)
+_OMITTED = object()  # the default of the checked parameters in the generated wrappers, replaced by their default
 
-def _checking_annotations(func, pre_check, post_check):
+
+def _checking_annotations(func, pre_check, post_check, yield_check=None, sampler=None, annotations=None):
     """
     Takes a pre checker, a function and a post checker and runs them in order.
 
+    The wrapper is generated with the same parameter list as func, the checks are inlined for
+    every annotated parameter, so no binding of the arguments is needed at call.
+
     :param func: (callable) the function you want to check
-    :param pre_check: (callable) the check you want to run before execution
-    :param post_check: (callable) the check you want to run after execution
+    :param pre_check: (callable) takes the annotation and the name of a parameter, returns the check you
+        want to run on it before execution
+    :param post_check: (callable) takes the return annotation, returns the check you want to run after execution
+    :param yield_check: (callable) takes the return annotation of an async generator function, returns the check of
+        the yielded values and the check of the sent values (or None), defaults to post_check for the yielded values
+    :param sampler: (CallSampler) selects the checked calls, None to check every call
+    :param annotations: ({str: Any}) the checked annotations, defaults to the annotations of func
+
+    A check with the attribute replaces_value set returns the value to use in place of the checked one.
+    A check with the attribute uses_context set also takes a dict, shared by the checks of a call.
+    Coroutine functions get a coroutine wrapper, and their awaited result is checked by post_check.
+    Async generator functions get an async generator wrapper, that checks every yielded and sent value.
+    If profiling.PROFILE is set, the time spent in the checks and in func is recorded (except for async generators).
+    With a sampler, only the calls it selects are checked (and profiled), the calls of async generators are all checked.
     """
     sig = signature(func)
-    ann = func.__annotations__
+    ann = func.__annotations__ if annotations is None else annotations
+    if any(name.startswith('__rc_') for name in sig.parameters):  # pragma: no cover
+        return _binding_wrapper(func, sig, pre_check, post_check, ann)
+
+    namespace = {'__rc_func__': func}
+    params = []
+    call_args = []
+    body = []
+    defaults = []
+    kw_only_marker = True
+    uses_context = False
+    for name, param in sig.parameters.items():
+        check_name = '__rc_check_{}__'.format(name)
+        replaces = False
+        context = ''
+        if name in ann:
+            namespace[check_name] = pre_check(ann[name], name)
+            replaces = getattr(namespace[check_name], 'replaces_value', False)
+            if getattr(namespace[check_name], 'uses_context', False):
+                uses_context = True
+                context = ', __rc_context__'
+        check_call = ('{0} = {1}({0}' if replaces else '{1}({0}') + context + ')'
+
+        if param.kind == Parameter.VAR_POSITIONAL:
+            kw_only_marker = False
+            params.append('*' + name)
+            call_args.append('*' + name)
+            if name in ann and replaces:
+                # tuple is bound in the namespace, as a parameter can be named tuple
+                namespace['__rc_tuple__'] = tuple
+                body.append('{0} = __rc_tuple__({1}(__rc_val__{2}) for __rc_val__ in {0})'
+                            .format(name, check_name, context))
+            elif name in ann:
+                body.append('for __rc_val__ in {}: {}(__rc_val__{})'.format(name, check_name, context))
+        elif param.kind == Parameter.VAR_KEYWORD:
+            params.append('**' + name)
+            call_args.append('**' + name)
+            if name in ann and replaces:
+                body.append('{0} = {{__rc_key__: {1}(__rc_val__{2}) for __rc_key__, __rc_val__ in {0}.items()}}'
+                            .format(name, check_name, context))
+            elif name in ann:
+                body.append('for __rc_val__ in {}.values(): {}(__rc_val__{})'.format(name, check_name, context))
+        else:
+            if param.kind == Parameter.KEYWORD_ONLY:
+                if kw_only_marker:
+                    kw_only_marker = False
+                    params.append('*')
+                call_args.append('{0}={0}'.format(name))
+            else:
+                call_args.append(name)
+
+            if param.default is Parameter.empty:
+                params.append(name)
+                if name in ann:
+                    body.append(check_call.format(name, check_name))
+            elif name in ann:
+                # an omitted argument gets the default value unchecked, a passed argument is checked even if it is
+                # the default value
+                default_name = '__rc_default_{}__'.format(name)
+                namespace[default_name] = param.default
+                namespace['__rc_omitted__'] = _OMITTED
+                params.append('{}=__rc_omitted__'.format(name))
+                defaults.append('if {} is __rc_omitted__: {} = {}'.format(name, name, default_name))
+                body.extend(['if {} is __rc_omitted__:'.format(name), '    {} = {}'.format(name, default_name),
+                             'else:', '    ' + check_call.format(name, check_name)])
+            else:
+                default_name = '__rc_default_{}__'.format(name)
+                namespace[default_name] = param.default
+                params.append('{}={}'.format(name, default_name))
+
+            if param.kind == Parameter.POSITIONAL_ONLY:
+                last_positional_only = len(params)
+    if any(param.kind == Parameter.POSITIONAL_ONLY for param in sig.parameters.values()):
+        params.insert(last_positional_only, '/')
+
+    call = '__rc_func__({})'.format(', '.join(call_args))
+    is_async = iscoroutinefunction(func)
+    if _isasyncgenfunction is not None and _isasyncgenfunction(func):
+        is_async = True
+        sampler = None
+        if 'return' in ann:
+            item_check, send_check = (yield_check or (lambda annotated: (post_check(annotated), None)))(ann['return'])
+            namespace['__rc_check_yield__'] = item_check
+            namespace['__rc_check_send__'] = send_check or _no_check
+        else:
+            namespace['__rc_check_yield__'] = namespace['__rc_check_send__'] = _no_check
+        body.extend(_ASYNC_GENERATOR_BODY.format(call).split('\n'))
+    else:
+        if is_async:
+            call = 'await ' + call
+        post_lines = []
+        if 'return' in ann:
+            namespace['__rc_check_return__'] = post_check(ann['return'])
+            context = ''
+            if getattr(namespace['__rc_check_return__'], 'uses_context', False):
+                uses_context = True
+                context = ', __rc_context__'
+            if getattr(namespace['__rc_check_return__'], 'replaces_value', False):
+                post_lines.append('__rc_return__ = __rc_check_return__(__rc_return__{})'.format(context))
+            else:
+                post_lines.append('__rc_check_return__(__rc_return__{})'.format(context))
+
+        recorders = []
+        if sampler is not None or profiling.PROFILE:
+            # the failures reported to violations.HANDLER do not raise, they are counted in the thread
+            namespace['__rc_failures__'] = violations._FAILURES
+        if sampler is not None:
+            # a failed check resets the countdown, the adaptive rate is updated from the time of the checked calls
+            namespace['__rc_sampler__'] = sampler
+            body = _notifying_failures(body)
+            post_lines = _notifying_failures(post_lines)
+            if sampler.adaptive:
+                recorders.append('__rc_sampler__')
+        if profiling.PROFILE:
+            # failed checks are counted
+            namespace['__rc_stats__'] = profiling._register('{}.{}'.format(func.__module__, func.__qualname__))
+            body = _counting_failures(body, 'pre_failures')
+            post_lines = _counting_failures(post_lines, 'post_failures')
+            recorders.append('__rc_stats__')
+
+        if recorders:
+            # the clock is read between the phases
+            namespace['__rc_clock__'] = profiling.perf_counter_ns
+            body = (['__rc_start__ = __rc_clock__()'] + body +
+                    ['__rc_checked__ = __rc_clock__()', '__rc_return__ = ' + call, '__rc_called__ = __rc_clock__()'] +
+                    post_lines + ['__rc_end__ = __rc_clock__()'] +
+                    ['{}.record(__rc_start__, __rc_checked__, __rc_called__, __rc_end__)'.format(recorder)
+                     for recorder in recorders] + ['return __rc_return__'])
+        elif post_lines:
+            body.extend(['__rc_return__ = ' + call] + post_lines + ['return __rc_return__'])
+        else:
+            body.append('return ' + call)
+    if uses_context:
+        body.insert(0, '__rc_context__ = {}')
+    if sampler is not None:
+        # the calls until the next checked call are counted down, the unchecked calls skip the checks
+        namespace['__rc_countdown__'] = 1
+        body = (['nonlocal __rc_countdown__', '__rc_countdown__ -= 1', 'if __rc_countdown__ > 0:'] +
+                ['    ' + line for line in defaults] +
+                ['    return ' + call, '__rc_countdown__ = __rc_sampler__.interval()'] + body)
+
+    # the wrapper has the name of func, that appears in the errors of the calls with invalid arguments
+    wrapper_name = getattr(func, '__name__', '_wrapper')
+    if not wrapper_name.isidentifier() or iskeyword(wrapper_name) or wrapper_name.startswith('__rc_'):
+        wrapper_name = '_wrapper'
+    source = 'def __rc_create__({}):\n    {}def {}({}):\n{}\n    return {}'.format(
+        ', '.join(namespace), 'async ' if is_async else '', wrapper_name, ', '.join(params),
+        '\n'.join('        ' + line for line in body), wrapper_name)
+    local_vars = {}
+    exec(source, {}, local_vars)  # pylint: disable=exec-used
+    wrapper = wraps(func)(local_vars['__rc_create__'](**namespace))
+    if sampler is not None:
+        wrapper.call_sampler = sampler
+    return wrapper
+
+
+def _counting_failures(lines, counter):
+    """
+    Wraps the lines of checks, so that their failures are counted in the statistics of a profiled function,
+    whether they raised or were reported.
+
+    :param lines: ([str]) the lines of the checks
+    :param counter: (str) the attribute of the statistics counting the failures
+    :return: ([str]) the wrapped lines
+    """
+    if not lines:
+        return []
+    return (['__rc_reported__ = __rc_failures__.count', 'try:'] + ['    ' + line for line in lines] +
+            ['except BaseException:', '    __rc_stats__.{} += 1'.format(counter), '    raise',
+             'if __rc_failures__.count != __rc_reported__:', '    __rc_stats__.{} += 1'.format(counter)])
+
+
+def _notifying_failures(lines):
+    """
+    Wraps the lines of checks, so that their failures are recorded by the call sampler, and the next call is checked,
+    whether they raised or were reported.
+
+    :param lines: ([str]) the lines of the checks
+    :return: ([str]) the wrapped lines
+    """
+    if not lines:
+        return []
+    return (['__rc_reported__ = __rc_failures__.count', 'try:'] + ['    ' + line for line in lines] +
+            ['except BaseException:', '    __rc_countdown__ = __rc_sampler__.failed()', '    raise',
+             'if __rc_failures__.count != __rc_reported__:', '    __rc_countdown__ = __rc_sampler__.failed()'])
+
+
+def _no_check(val):
+    """
+    Check of the values that are not annotated.
+    """
+    pass
+
+
+# delegates to the wrapped async generator, including asend and athrow, checking the yielded and sent values
+_ASYNC_GENERATOR_BODY = """__rc_agen__ = {}
+__rc_sent__ = None
+try:
+    while True:
+        try:
+            __rc_item__ = await __rc_agen__.asend(__rc_sent__)
+        except StopAsyncIteration:
+            return
+        __rc_check_yield__(__rc_item__)
+        while True:
+            try:
+                __rc_sent__ = yield __rc_item__
+                break
+            except GeneratorExit:
+                raise
+            except BaseException as __rc_exc__:
+                try:
+                    __rc_item__ = await __rc_agen__.athrow(__rc_exc__)
+                except StopAsyncIteration:
+                    return
+                __rc_check_yield__(__rc_item__)
+        if __rc_sent__ is not None:
+            __rc_check_send__(__rc_sent__)
+finally:
+    await __rc_agen__.aclose()"""
+
+
+def _binding_wrapper(func, sig, pre_check, post_check, ann):  # pragma: no cover
+    """
+    Fallback of _checking_annotations, binds the arguments to the signature at every call.
+
+    :param func: (callable) the function you want to check
+    :param sig: (Signature) the signature of func
+    :param pre_check: (callable) see _checking_annotations
+    :param post_check: (callable) see _checking_annotations
+    :param ann: ({str: Any}) the checked annotations
+    """
+    checks = {name: pre_check(annotated, name) for name, annotated in ann.items() if name != 'return'}
+    return_check = post_check(ann['return']) if 'return' in ann else None
 
     @wraps(func)
     def _wrapper(*args, **kwargs):
@@ -27,20 +288,47 @@ def _checking_annotations(func, pre_check, post_check):
         A simple wrapper for the checking of a function
         """
         bound = sig.bind(*args, **kwargs)
-        for name, val in bound.arguments.items():
-            if name in ann:
-                pre_check(ann[name], val, name)
+        context = {}
 
-        return_val = func(*args, **kwargs)
-        if 'return' in ann:
-            post_check(ann['return'], return_val)
+        def run(check, val):
+            return check(val, context) if getattr(check, 'uses_context', False) else check(val)
+
+        for name, val in bound.arguments.items():
+            if name in checks:
+                kind = sig.parameters[name].kind
+                if kind == Parameter.VAR_POSITIONAL:
+                    val = tuple(run(checks[name], elem) for elem in val)
+                elif kind == Parameter.VAR_KEYWORD:
+                    val = {key: run(checks[name], elem) for key, elem in val.items()}
+                else:
+                    val = run(checks[name], val)
+                if getattr(checks[name], 'replaces_value', False):
+                    bound.arguments[name] = val
+
+        return_val = func(*bound.args, **bound.kwargs)
+        if return_check is not None:
+            checked = run(return_check, return_val)
+            if getattr(return_check, 'replaces_value', False):
+                return_val = checked
         return return_val
 
     return _wrapper
 
 
+def _call_sampler(rate, max_overhead):
+    """
+    Returns the sampling state of the calls of a decorated function.
 
-def enforce_annotations(func):
+    :param rate: (float) the probability that a call is checked, None to check every call
+    :param max_overhead: (float) the target share of the run time spent in the checks, None for a fixed rate
+    :return: (CallSampler) the state, None if every call is checked
+    """
+    if rate is None and max_overhead is None:
+        return None
+    return CallSampler(rate, max_overhead)
+
+
+def enforce_annotations(func=None, *, rate=None, max_overhead=None):
     """
     An annotation used to enforce callable functions on the associated variable
 
@@ -52,25 +340,38 @@ def enforce_annotations(func):
         @enforce_annotations
         def hello(a: [BoundChecker[(0,1)], TypeChecker[int,float]]) -> [BoundChecker[(0,1,(False, True))]]:
             return 0.2
+
+        @enforce_annotations(rate=0.01)
+        def hello(a: TypeChecker[int]):
+            pass
+
+    the decorated function is returned unchanged if the check level of its module is 'off',
+    and the annotations are not called in a context where the checks are disabled (see config.checking).
+    rate and max_overhead select the checked calls, see check_type_at_run.
     """
-    def _pre_check(annotated, val, name):
-        if isinstance(annotated, Iterable):
+    if func is None:
+        return partial(enforce_annotations, rate=rate, max_overhead=max_overhead)
+    if config.get_level(func.__module__) == 'off':
+        return func
+
+    def _pre_check(annotated, name):
+        annotated = tuple(annotated) if isinstance(annotated, Iterable) else (annotated,)
+
+        def check(val):
+            options = _OPTIONS.get()
+            if options is not None and options.enabled is False:
+                return
             for ann in annotated:
                 ann(val)
-        else:
-            annotated(val)
+        return check
 
-    def _post_check(annotated, val):
-        if isinstance(annotated, Iterable):
-            for ann in annotated:
-                ann(val)
-        else:
-            annotated(val)
+    def _post_check(annotated):
+        return _pre_check(annotated, 'return')
 
-    return _checking_annotations(func, _pre_check, _post_check)
+    return _checking_annotations(func, _pre_check, _post_check, sampler=_call_sampler(rate, max_overhead))
 
 
-def check_bound_at_run(func):
+def check_bound_at_run(func=None, *, rate=None, max_overhead=None):
     """
     Annotation used to enforce bounds on the associated variable
 
@@ -93,28 +394,141 @@ def check_bound_at_run(func):
     the tuple defining the bounds are (Lower_bound, Upper_bound, (Include_lower_bound, Include_upper_bound))
         or (Lower_bound, Upper_bound)
     You may use lists of bounds to define discontinuous bounds
+    NumPy arrays are checked elementwise
+    the decorated function is returned unchanged if the check level of its module is 'off',
+    and the bounds are not checked in a context where the checks are disabled (see config.checking).
+    rate and max_overhead select the checked calls, see check_type_at_run.
     """
+    if func is None:
+        return partial(check_bound_at_run, rate=rate, max_overhead=max_overhead)
+    if config.get_level(func.__module__) == 'off':
+        return func
 
-    def _pre_check(annotated, val, name):
-        if isinstance(annotated, list):
-            valid = any([BoundChecker._in_bounds(val, key) for key in annotated])
-        else:
-            valid = BoundChecker._in_bounds(val, annotated)
-        if not valid:
-            raise ValueError("Number out of bounds {} for argument {}, expected bounds {}".format(val, name, annotated))
+    def _pre_check(annotated, name):
+        return _bound_check(annotated, 'argument ' + name)
 
-    def _post_check(annotated, val):
-        if isinstance(annotated, list):
-            valid = any([BoundChecker._in_bounds(val, key) for key in annotated])
-        else:
-            valid = BoundChecker._in_bounds(val, annotated)
-        if not valid:
-            raise ValueError("Number out of bounds {} for return, expected bounds {}".format(val, annotated))
+    def _post_check(annotated):
+        return _bound_check(annotated, 'return')
+
+    return _checking_annotations(func, _pre_check, _post_check, sampler=_call_sampler(rate, max_overhead))
+
+
+def _bound_check(annotated, description):
+    """
+    Returns the check of bounds, compiled once.
+
+    :param annotated: (tuples or [tuples]) the bounds, see BoundChecker
+    :param description: (str) the checked value, used in the error messages
+    :return: (callable) function that takes a value and will raise an error if not valid
+    """
+    in_bounds = BoundChecker._compile(annotated)
+    site = violations._Site(ValueError, lambda val, valid: "Number out of bounds {} for {}, expected bounds {}".format(
+        _out_of_bounds(val, valid), description, annotated))
+    not_number = violations._Site(TypeError, _not_number)
+
+    def check(val):
+        options = _OPTIONS.get()
+        if options is not None and options.enabled is False:
+            return
+        _check_bounds(site, not_number, in_bounds, val)
+    return check
+
+
+def _type_check(annotated, description, sampling=None, deep=None):
+    """
+    Returns the check of a type, compiled once so the calls do no typing introspection.
+
+    :param annotated: (Type or Typing object) the type
+    :param description: (str) the checked value, used in the error messages
+    :param sampling: (Sampling) see TypeChecker._checker
+    :param deep: (bool) see TypeChecker._checker
+    :return: (callable) function that takes a value and will raise an error if not valid
+    """
+    type_check = TypeChecker._checker(annotated, sampling, deep)
+    site = violations._Site(TypeError, lambda val, _: 'Expected {} for {}, got {}'.format(
+        annotated, description, val.__class__))
 
-    return _checking_annotations(func, _pre_check, _post_check)
+    def check(val):
+        if not type_check(val):
+            site.fail(val)
+    return check
 
 
-def check_type_at_run(func):
+def _annotation_check(annotated, description, sampling=None, deep=None):
+    """
+    Returns the type check of an argument or of a return value, including the unification of the symbolic sizes
+    of arrays and the wrapping of iterators.
+
+    :param annotated: (Type or Typing object) the type
+    :param description: (str) the checked value, used in the error messages
+    :param sampling: (Sampling) see TypeChecker._checker
+    :param deep: (bool) see TypeChecker._checker
+    :return: (callable) the check, see _checking_annotations
+    """
+    check = _binding_dims(_type_check(annotated, description, sampling, deep), annotated, description)
+    return _streaming(check, TypeChecker._streamer(annotated, description, sampling, deep))
+
+
+def _yield_checks(annotated, sampling=None, deep=None):
+    """
+    Returns the type checks of the yielded and of the sent values of an async generator.
+
+    :param annotated: (Typing object) AsyncGenerator[Y, S], AsyncIterator[Y] or AsyncIterable[Y]
+    :param sampling: (Sampling) see TypeChecker._checker
+    :param deep: (bool) see TypeChecker._checker
+    :return: (callable, callable) the check of the yielded values, and of the sent values (or None)
+    """
+    keys = getattr(annotated, '__args__', None) or (Any,)
+    send_check = _type_check(keys[1], 'a sent value', sampling, deep) if len(keys) > 1 else None
+    return _type_check(keys[0], 'a yielded value', sampling, deep), send_check
+
+
+def _binding_dims(check, annotated, description):
+    """
+    Combines a check with the unification of the symbolic sizes of an ArraySpec (or Optional[ArraySpec]) annotation,
+    across all the arguments and the return value of a call.
+
+    :param check: (callable) the check of the value
+    :param annotated: (Type or Typing object) the annotation
+    :param description: (str) the checked value, used in the error messages
+    :return: (callable) the check, taking the symbolic sizes bound in the call if the annotation has any
+    """
+    keys = annotated.__args__ if _is_union(annotated) else (annotated,)
+    specs = [key for key in keys if isinstance(key, ArraySpec)]
+    if len(specs) != 1 or not specs[0].symbols:
+        return check
+    spec = specs[0]
+    site = violations._Site(TypeError, lambda val, dims: 'Expected {} for {} with the sizes {}, got the shape {}'.format(
+        spec, description, dims, val.shape))
+
+    def binding_check(val, dims):
+        check(val)
+        # an invalid value that was reported rather than raised is not bound
+        if _is_array(val) and val.ndim == len(spec.shape) and not spec._bind(val, dims):
+            site.fail(val, dict(dims))
+    binding_check.uses_context = True
+    return binding_check
+
+
+def _streaming(check, stream):
+    """
+    Combines a check with the wrapping of iterators, whose elements are then checked as they are yielded.
+
+    :param check: (callable) the check of the value
+    :param stream: (callable) returns the value or its checking proxy, None if the value is not streamed
+    :return: (callable) the check, returning the value to use if it is streamed
+    """
+    if stream is None:
+        return check
+
+    def streaming_check(val):
+        check(val)
+        return stream(val)
+    streaming_check.replaces_value = True
+    return streaming_check
+
+
+def check_type_at_run(func=None, *, sampling=None, deep=None, rate=None, max_overhead=None):
     """
     Annotation used to check the type of an associated variable
 
@@ -134,16 +548,235 @@ def check_type_at_run(func):
             else:
                 return a
 
+        @check_type_at_run(sampling=Sampling(first=100))
+        def hello(a: List[int]):
+            pass
+
+        @check_type_at_run(deep=True)
+        def hello(a: List[int]):
+            pass
+
+        @check_type_at_run(rate=0.01)  # one call in 100, drawn at random
+        def hello(a: List[int]):
+            pass
+
+        @check_type_at_run(max_overhead=0.05)  # the checks take about 5% of the run time
+        def hello(a: List[int]):
+            pass
+
     you may use typing.Union[int, float] for mutliple valid types
     or List[int], Dict[str, int], Optional[int].
+    a protocol is checked once per class, a class changed after its first check keeps its verdict until
+    TypeChecker.invalidate is called for it.
+    the sampling limits the elements checked in DEEP mode, and overrides the sampling of the context
+    (see config.checking) and check_type.SAMPLING.
+    deep overrides the check level, the deep option of the context and check_type.DEEP.
+    in DEEP mode, the iterators and generators annotated with Iterator[], Iterable[] or Generator[] are wrapped,
+    their elements are checked as they are yielded.
+    the check level of the module of the decorated function can disable the checks ('off'),
+    or override check_type.DEEP ('shallow' or 'deep').
+    rate is the probability that a call is checked, the other calls skip the checks.
+    with max_overhead, the rate is adapted to the time measured in the checked calls, so that the checks take this
+    share of the run time, and every call is checked again for a while after a failed check (see call_sampling).
+    """
+    if func is None:
+        return partial(check_type_at_run, sampling=sampling, deep=deep, rate=rate, max_overhead=max_overhead)
+    level = config.get_level(func.__module__)
+    if level == 'off':
+        return func
+    if deep is None and level is not None:
+        deep = level == 'deep'
+
+    def _pre_check(annotated, name):
+        return _annotation_check(annotated, 'argument ' + name, sampling, deep)
+
+    def _post_check(annotated):
+        return _annotation_check(annotated, 'return', sampling, deep)
+
+    return _checking_annotations(func, _pre_check, _post_check, partial(_yield_checks, sampling=sampling, deep=deep),
+                                 _call_sampler(rate, max_overhead))
+
+
+def _is_bounds(annotated):
+    """
+    :param annotated: (Any) an annotation
+    :return: (bool) whether the annotation is a bound tuple or a list of bound tuples, rather than a type
+    """
+    return isinstance(annotated, tuple) or \
+        (isinstance(annotated, list) and bool(annotated) and all(isinstance(bound, tuple) for bound in annotated))
+
+
+def _is_class_var(annotated):
     """
-    def _pre_check(annotated, val, name):
-        if not TypeChecker._check_type(annotated, val):
-            raise TypeError('Expected {} for argument {}, got {}'.format(annotated, name, val.__class__))
+    :param annotated: (Any) an annotation
+    :return: (bool) whether the annotation is typing.ClassVar or ClassVar[T]
+    """
+    return annotated is ClassVar or type(annotated) is type(ClassVar) or \
+        getattr(annotated, '__origin__', None) is ClassVar
 
-    def _post_check(annotated, val):
-        if not TypeChecker._check_type(annotated, val):
-            raise TypeError('Expected {} for return, got {}'.format(annotated, val.__class__))
 
-    return _checking_annotations(func, _pre_check, _post_check)
+def _resolved(annotations, globalns, localns):
+    """
+    Evaluates the annotations written as strings (forward references), and the strings within typing objects.
 
+    :param annotations: ({str: Any}) the annotations
+    :param globalns: (dict) the globals of the module where the annotations are written
+    :param localns: (dict) the other names visible to the annotations, such as the name of the decorated class
+    :return: ({str: Any}) the annotations, without the strings that cannot be resolved yet, that are not checked
+    """
+    resolved = {}
+    for name, annotated in annotations.items():
+        try:
+            if isinstance(annotated, str):
+                annotated = eval(annotated, globalns, localns)  # pylint: disable=eval-used
+            annotated = typing._eval_type(annotated, globalns, localns)  # pylint: disable=protected-access
+        except Exception:  # pylint: disable=broad-except
+            continue
+        resolved[name] = annotated
+    return resolved
+
+
+def _functions(member):
+    """
+    :param member: (Any) an attribute of a class
+    :return: ([callable]) the functions of the member, for a method, a staticmethod, a classmethod or a property
+    """
+    if isinstance(member, (staticmethod, classmethod)):
+        return [member.__func__]
+    elif isinstance(member, property):
+        return [func for func in (member.fget, member.fset, member.fdel) if func is not None]
+    return [member]
+
+
+def _uses_class_cell(namespace):
+    """
+    :param namespace: (dict) the attributes of a class
+    :return: (bool) whether a method uses the __class__ cell, as super() without arguments does
+    """
+    return any('__class__' in getattr(getattr(func, '__code__', None), 'co_freevars', ())
+               for member in namespace.values() for func in _functions(member))
+
+
+def _set_class_cells(namespace, old_cls, new_cls):
+    """
+    Points the __class__ cells of the methods of a recreated class (used by super()) to the new class.
+    The cells are read only before python 3.7, where check_class_at_run refuses to recreate such a class.
+
+    :param namespace: (dict) the attributes of the new class
+    :param old_cls: (type) the class before it was recreated
+    :param new_cls: (type) the recreated class
+    """
+    for member in namespace.values():
+        for func in _functions(member):
+            while func is not None:
+                for cell in getattr(func, '__closure__', None) or ():
+                    try:
+                        if cell.cell_contents is old_cls:
+                            cell.cell_contents = new_cls
+                    except ValueError:  # empty cell
+                        pass
+                func = getattr(func, '__wrapped__', None)
+
+
+def check_class_at_run(cls=None, *, slots=False):
+    """
+    Class decorator checking the annotated attributes at assignment, and the annotated methods at call
+
+    ex:
+        @check_class_at_run
+        class Record(object):
+            name: str
+            score: (0, 1)
+            tags: List[str] = []
+
+            def rename(self, name: str) -> None:
+                self.name = name
+
+        @check_class_at_run(slots=True)
+        class Point(object):
+            x: float
+            y: float
+
+    the class annotations can be types (see check_type_at_run), or bounds (see check_bound_at_run).
+    the checks are compiled once here, an assignment costs a dict lookup and the call of the check of the attribute,
+    and the reads of the attributes are not slowed down. The default values of the class are not checked.
+    the methods with annotations are wrapped once, their annotations can also be types or bounds.
+    with slots, the class is recreated with the annotated attributes in __slots__, so that its instances have no
+    __dict__ (if the bases have __slots__ too), and the default values are set at the creation of every instance.
+    Before python 3.7, slots raises a TypeError if a method uses super() without arguments, that would refer to the
+    class before it was recreated.
+    the annotations written as strings are resolved in the module of the class, where the name of the class refers to
+    the class itself (without slots), the ones that cannot be resolved yet are not checked.
+    the decorated class is returned unchanged if the check level of its module is 'off',
+    the 'shallow' and 'deep' levels override check_type.DEEP.
+    """
+    if cls is None:
+        return partial(check_class_at_run, slots=slots)
+    level = config.get_level(cls.__module__)
+    if level == 'off':
+        return cls
+    deep = None if level is None else level == 'deep'
+    if slots and sys.version_info < (3, 7) and _uses_class_cell(cls.__dict__):
+        raise TypeError("slots cannot be used before python 3.7 on {}, a method uses super() without arguments, "
+                        "use super({}, self) instead".format(cls.__qualname__, cls.__name__))
+
+    # the recreated class with slots is not the decorated class, that its name cannot refer to
+    localns = {} if slots else {cls.__name__: cls}
+    module_globals = getattr(sys.modules.get(cls.__module__), '__dict__', {})
+    annotations = {name: annotated for name, annotated in _resolved(cls.__dict__.get('__annotations__', {}),
+                                                                     module_globals, localns).items()
+                   if not _is_class_var(annotated)}
+    checks = {name: _bound_check(annotated, 'attribute ' + name) if _is_bounds(annotated) else
+                    _type_check(annotated, 'attribute ' + name, deep=deep)
+              for name, annotated in annotations.items()}
+
+    def _pre_check(annotated, name):
+        if _is_bounds(annotated):
+            return _bound_check(annotated, 'argument ' + name)
+        return _annotation_check(annotated, 'argument ' + name, deep=deep)
+
+    def _post_check(annotated):
+        if _is_bounds(annotated):
+            return _bound_check(annotated, 'return')
+        return _annotation_check(annotated, 'return', deep=deep)
+
+    namespace = dict(cls.__dict__)
+    for name, member in cls.__dict__.items():
+        func = member.__func__ if isinstance(member, (staticmethod, classmethod)) else member
+        if callable(func) and not isinstance(func, type) and getattr(func, '__annotations__', None):
+            resolved = _resolved(func.__annotations__, getattr(func, '__globals__', module_globals), localns)
+            wrapped = _checking_annotations(func, _pre_check, _post_check, partial(_yield_checks, deep=deep),
+                                            annotations=resolved)
+            namespace[name] = type(member)(wrapped) if func is not member else wrapped
+
+    base_setattr = cls.__setattr__
+
+    def __setattr__(self, name, val):
+        check = checks.get(name)
+        if check is not None:
+            check(val)
+        base_setattr(self, name, val)
+    namespace['__setattr__'] = __setattr__
+
+    if slots:
+        defaults = {name: namespace.pop(name) for name in annotations if name in namespace}
+        namespace['__slots__'] = tuple(name for name in annotations if name not in namespace.get('__slots__', ()))
+        namespace.pop('__dict__', None)
+        namespace.pop('__weakref__', None)
+        if defaults:
+            base_init = namespace.get('__init__', cls.__init__)
+
+            def __init__(self, *args, **kwargs):
+                for name, val in defaults.items():
+                    object.__setattr__(self, name, val)
+                base_init(self, *args, **kwargs)
+            namespace['__init__'] = wraps(base_init)(__init__)
+        new_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+        new_cls.__qualname__ = cls.__qualname__
+        _set_class_cells(namespace, cls, new_cls)
+        return new_cls
+
+    for name, member in namespace.items():
+        if member is not cls.__dict__.get(name):
+            setattr(cls, name, member)
+    return cls
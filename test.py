@@ -1,12 +1,25 @@
 """
 Test code
 """
-from typing import Union, Any, Optional, List, Dict, Tuple, TypeVar, Set, Callable, Iterator, Mapping
+import abc
+import array
+import asyncio
+import inspect
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import typing
+from typing import Union, Any, Optional, List, Dict, Tuple, TypeVar, Set, Callable, Iterator, Mapping, Iterable, \
+    Generator
 
 import numpy
 
 import runtime_check
-from runtime_check import check_type_at_run, TypeChecker, check_bound_at_run, BoundChecker, enforce_annotations
+from runtime_check import check_type_at_run, TypeChecker, check_bound_at_run, BoundChecker, enforce_annotations, \
+    Sampling, ArraySpec, TypedList, TypedDict, TypedSet, check_class_at_run, Parallel, Schema
 
 runtime_check.check_type.DEEP = True
 
@@ -85,6 +98,31 @@ def test_type_decorator_complex():
         _check_complex(*val)
 
 
+def test_type_decorator_default():
+    """
+    test type decorator default
+    """
+    tags = []
+
+    @check_type_at_run
+    def _check_default(val_a: int = None, *, val_b: List[str] = tags):
+        return val_a, val_b
+
+    @check_type_at_run(rate=0.5)
+    def _check_sampled(val_a: int = None):
+        return val_a
+
+    # the omitted arguments get their default unchecked, the passed ones are checked
+    assert _check_default() == (None, tags) and _check_default()[1] is tags
+    assert _check_default(1, val_b=["a"]) == (1, ["a"])
+    assert all(_check_sampled() is None for _ in range(100))
+    for call in [lambda: _check_default(None), lambda: _check_default(val_b=None), lambda: _check_default(val_b=[1])]:
+        try:
+            call()
+            raise EnvironmentError("Error: {} should not be valid".format(call))
+        except TypeError:
+            pass
+
 
 def test_type_union():
     """
@@ -298,6 +336,28 @@ def test_bounds_discontinuous():
         print(val)
         BoundChecker[(0, 1), (2, 4)](val)
 
+
+def test_bounds_discontinuous_threaded():
+    """
+    test bounds discontinuous, the bounds of the arrays are built by the first check, that can run in several
+    threads at once
+    """
+    in_bounds = BoundChecker._compile([(0, 1), (2, 4), (6, 8)])
+    barrier = threading.Barrier(8)
+    results = []
+
+    def _first_check():
+        barrier.wait()
+        results.append(in_bounds(numpy.array([0.5, 5.0, 7.0])).tolist())
+
+    threads = [threading.Thread(target=_first_check) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [[True, False, True]] * 8
+
+
 def test_bounds_simple():
     """
     test bounds simple
@@ -470,3 +530,1306 @@ def test_check_wrapper_coverage():
             return min(val_a, 100)
 
     _check_discontinuous_return(100, 0.5)
+
+
+def test_type_compiled():
+    """
+    test type compiled checkers
+    """
+
+    for val in [[1, ""], (1, ""), ("",), None, [None]]:
+        # these should fail
+        try:
+            print(val)
+            TypeChecker[Union[List[int], Tuple[int, ...]]](val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    print()
+    for val in [[], [1, 2], (), (1, 2, 3)]:
+        print(val)
+        TypeChecker[Union[List[int], Tuple[int, ...]]](val)
+
+    assert TypeChecker._compile(Optional[List[int]], True) is TypeChecker._compile(Optional[List[int]], True)
+    assert TypeChecker._compile(Optional[List[int]], True)([1, 2])
+    assert not TypeChecker._compile(Optional[List[int]], True)([1, ""])
+    assert TypeChecker._compile(Optional[List[int]], False)([1, ""])
+    TypeChecker[TypeVar('t')](None)
+
+
+def test_wrapper_signature():
+    """
+    test wrapper signature
+    """
+
+    @check_type_at_run
+    def _check_signature(val_a: int, val_b: str = None, *args: float, val_c: int, val_d: int = 1,
+                         **kwargs: str) -> int:
+        return val_a + val_c + val_d + len(args) + len(kwargs)
+
+    for val in [((0.0,), {"val_c": 0}), ((0, 1), {"val_c": 0}), ((0, "", 1), {"val_c": 0}),
+                ((0,), {"val_c": 0, "val_d": None}), ((0,), {"val_c": 0, "val_e": 1}), ((0,), {})]:
+        # these should fail
+        try:
+            print(val)
+            _check_signature(*val[0], **val[1])
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    print()
+    for val in [((0,), {"val_c": 0}), ((0, "", 1.0, 2.0), {"val_c": 0, "val_e": ""}),
+                ((), {"val_a": 0, "val_b": "", "val_c": 0, "val_d": 2})]:
+        print(val)
+        _check_signature(*val[0], **val[1])
+
+    assert _check_signature(0, "", 1.0, val_c=1, val_e="") == 4
+    assert _check_signature.__name__ == "_check_signature"
+    assert str(inspect.signature(_check_signature)) == str(inspect.signature(_check_signature.__wrapped__))
+    try:
+        _check_signature(0)
+        raise EnvironmentError("Error: {} should not be valid".format((0,)))
+    except TypeError as error:
+        assert "_check_signature()" in str(error)
+
+    # the parameters can be named as the builtins used by the wrapper
+    @check_type_at_run
+    def _check_shadowing(*tuple: Iterator[int]):  # pylint: disable=redefined-builtin
+        return [list(val) for val in tuple]
+
+    assert _check_shadowing(iter([1]), iter([2, 3])) == [[1], [2, 3]]
+
+
+def test_bounds_array():
+    """
+    test bounds array
+    """
+
+    @check_bound_at_run
+    def _check_array(val_a: [(float('-inf'), -1), (0, 1, (True, False))]):
+        return val_a
+
+    for val in [numpy.array([0.5, 1.0]), numpy.array([[0, 0], [0, -0.5]]), numpy.array([float("nan")]),
+                numpy.array(["a"]), numpy.array(1)]:
+        # these should fail
+        try:
+            print(val)
+            _check_array(val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+        except ValueError:
+            pass
+
+    print()
+    for val in [numpy.array([]), numpy.array([0, 0.5, -1, -10]), numpy.zeros((3, 3), dtype=numpy.int32),
+                numpy.array(0.5)]:
+        print(val)
+        _check_array(val)
+        BoundChecker[(float('-inf'), -1), (0, 1, (True, False))](val)
+
+    runtime_check.check_bounds.COUNT_VIOLATIONS = True
+    try:
+        BoundChecker.probability(numpy.array([[0, 2], [3, 0.5]]))
+        raise EnvironmentError("Error: should not be valid")
+    except ValueError as ex:
+        assert "2.0 at index (0, 1) (2 of 4 values)" in str(ex)
+    finally:
+        runtime_check.check_bounds.COUNT_VIOLATIONS = False
+
+
+def test_bounds_merged():
+    """
+    test bounds merged intervals
+    """
+     # [0, 1[ or [1, 2] or ]3, 4[ or ]4, 5] or [4.5, 6]
+
+    bounds = [(4, 5, (False, True)), (0, 1, (True, False)), (3, 4, (False, False)), (1, 2), (4.5, 6)]
+    assert BoundChecker._parse(bounds) == [(0, 2, True, True), (3, 4, False, False), (4, 6, False, True)]
+
+    for val in [-1, 2.5, 3, 4, 6.5, float("nan"), numpy.array([0, 4]), numpy.array([3.0, 1.0])]:
+        # these should fail
+        try:
+            print(val)
+            BoundChecker[bounds](val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except ValueError:
+            pass
+
+    print()
+    for val in [0, 1, 2, 3.5, 4.5, 5, 6, numpy.array([[0, 1], [2, 6]]), numpy.array([3.5, 4.1])]:
+        print(val)
+        BoundChecker[bounds](val)
+
+    for bounds in [(1, 0), (0, "1"), (0, 1, (1, 0)), [(0, 1), 1], (0, float("nan"))]:
+        # these should fail at decoration
+        try:
+            print(bounds)
+
+            @check_bound_at_run
+            def _check_invalid(val_a: bounds):
+                return val_a
+            raise EnvironmentError("Error: {} should not be valid".format(bounds))
+        except TypeError:
+            pass
+        except ValueError:
+            pass
+
+
+def test_type_sampling():
+    """
+    test type sampling
+    """
+
+    @check_type_at_run(sampling=Sampling(first=10))
+    def _check_first(val_a: List[int]):
+        return val_a
+
+    for val in [[""], list(range(9)) + [""], {1}]:
+        # these should fail
+        try:
+            print(val)
+            _check_first(val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    print()
+    for val in [[], list(range(10)), list(range(10)) + [""]]:
+        print(val)
+        _check_first(val)
+
+    result = TypeChecker.report(Dict[str, List[int]], {"a": list(range(100)), "b": [1]})
+    assert result == (True, True, 103)
+    result = TypeChecker.report(List[int], list(range(100)) + [""], Sampling(sample=10))
+    assert result.checked == 10 and not result.exhaustive
+    result = TypeChecker.report(List[List[int]], [[1, 2], [3, ""]], Sampling(max_elements=3))
+    assert result == (True, False, 3)
+    assert not TypeChecker.report(List[List[int]], [[1, 2], [3, ""]], Sampling(max_elements=6)).valid
+    assert not TypeChecker.report(Set[int], {1, ""}).valid
+    assert not TypeChecker.report(List[int], list(range(10000)), Sampling(max_time=0)).exhaustive
+
+    # the equal samplings share their compiled checks
+    compiled = len(runtime_check.check_type._COMPILED)
+    for _ in range(10):
+        TypeChecker.report(List[int], [1], Sampling(sample=10))
+    assert len(runtime_check.check_type._COMPILED) == compiled
+    assert Sampling(first=2) == Sampling(first=2) and Sampling(first=2) != Sampling(first=3)
+
+    runtime_check.check_type.SAMPLING = Sampling(first=1)
+    try:
+        TypeChecker[List[int]]([0, ""])
+    finally:
+        runtime_check.check_type.SAMPLING = None
+
+
+def test_check_levels():
+    """
+    test check levels
+    """
+
+    def _identity(val_a: List[int]):
+        return val_a
+
+    def _bounded(val_a: (0, 1)):
+        return val_a
+
+    runtime_check.set_level('off', __name__)
+    try:
+        assert check_type_at_run(_identity) is _identity
+        assert check_bound_at_run(_bounded) is _bounded
+        assert runtime_check.get_level(__name__ + ".sub_module") == 'off'
+
+        runtime_check.set_level('deep', __name__)
+        _deep_check = check_type_at_run(_identity)
+        runtime_check.set_level('shallow', __name__)
+        _shallow_check = check_type_at_run(_identity)
+    finally:
+        runtime_check.set_level(None, __name__)
+
+    runtime_check.check_type.DEEP = False
+    try:
+        _deep_check([1, ""])
+        raise EnvironmentError("Error: {} should not be valid".format([1, ""]))
+    except TypeError:
+        pass
+    finally:
+        runtime_check.check_type.DEEP = True
+    _shallow_check([1, ""])
+
+    try:
+        runtime_check.set_level('everything')
+        raise EnvironmentError("Error: {} should not be valid".format('everything'))
+    except ValueError:
+        pass
+
+    runtime_check.config._load_environment("shallow, test_module.sub = off")
+    try:
+        assert runtime_check.get_level("test_module.sub.sub") == 'off'
+        assert runtime_check.get_level("test_module") == 'shallow'
+    finally:
+        runtime_check.set_level(None)
+        runtime_check.set_level(None, "test_module.sub")
+
+
+def test_check_context():
+    """
+    test context scoped check options
+    """
+
+    @check_type_at_run
+    def _identity(val_a: List[int]):
+        return val_a
+
+    @check_type_at_run(deep=True)
+    def _deep_identity(val_a: List[int]):
+        return val_a
+
+    @check_bound_at_run
+    def _bounded(val_a: (0, 1)):
+        return val_a
+
+    with runtime_check.checking(deep=False):
+        _identity([1, ""])
+        try:
+            _deep_identity([1, ""])
+            raise EnvironmentError("Error: {} should not be valid".format([1, ""]))
+        except TypeError:
+            pass
+
+        with runtime_check.checking(enabled=False):
+            assert runtime_check.config._OPTIONS.get() == runtime_check.Options(False, False, None)
+            _deep_identity([1, ""])
+            _bounded(2)
+            BoundChecker[(0, 1)](2)
+            TypeChecker[int]("")
+
+        with runtime_check.checking(sampling=Sampling(first=1)):
+            _identity([1, ""])
+    assert runtime_check.config._OPTIONS.get() is None
+
+    try:
+        _identity([1, ""])
+        raise EnvironmentError("Error: {} should not be valid".format([1, ""]))
+    except TypeError:
+        pass
+
+    # the options are local to a thread
+    results = []
+    with runtime_check.checking(enabled=False):
+        thread = threading.Thread(target=lambda: results.append(runtime_check.config._OPTIONS.get()))
+        thread.start()
+        thread.join()
+    assert results == [None]
+
+
+def test_type_exact_types():
+    """
+    test deep checks scanning the element types
+    """
+
+    class _Int(int):
+        pass
+
+    def _check(key, val):
+        return TypeChecker._compile(key, True)(val)
+
+    assert _check(List[int], [1, 2, _Int(3), True])
+    assert not _check(List[int], [1, 2, 3.0])
+    assert _check(List[Optional[Union[int, str]]], [1, None, "a"])
+    assert not _check(List[Optional[int]], [None, "a"])
+    assert _check(Set[float], {1.0, 2.0}) and not _check(Set[float], {1.0, "a"})
+    assert _check(Dict[str, float], {"a": 1.0}) and not _check(Dict[str, float], {"a": 1})
+    assert _check(Dict[str, Any], {"a": []}) and not _check(Dict[str, Any], {1: []})
+
+    # the elements of arrays all have the same type, only the first one is checked
+    assert _check(Iterable[float], array.array('d', [1.0, 2.0])) and _check(Iterable[float], array.array('d'))
+    assert not _check(Iterable[str], array.array('i', [1]))
+    assert _check(Iterable[float], numpy.zeros(3)) and not _check(Iterable[int], numpy.zeros(3))
+    assert _check(Iterable[ArraySpec[numpy.float64, (2,)]], numpy.zeros((3, 2)))
+    assert not _check(Iterable[int], numpy.array([1, ""], dtype=object))
+    # a 0-d array is not iterable
+    for val in [numpy.array(1.0), numpy.array(1.0, dtype=object)]:
+        assert not _check(Iterable[float], val) and not _check(List[Iterable[float]], [val])
+        assert not TypeChecker.report(Iterable[float], val, Sampling(sample=10)).valid
+
+
+def test_type_walk():
+    """
+    test deep checks of nested, shared and cyclic containers
+    """
+
+    def _check(key, val):
+        return TypeChecker._compile(key, True)(val)
+
+    looped = []
+    looped.append(looped)
+    assert _check(List[List[List[Any]]], looped)
+    assert not _check(List[List[List[int]]], looped)
+    looped_dict = {}
+    looped_dict["a"] = [looped_dict]
+    assert _check(Dict[str, List[Dict[str, Any]]], looped_dict)
+    assert not _check(Dict[str, List[Dict[str, int]]], looped_dict)
+
+    assert _check(Union[List[List[int]], List[List[str]]], [["a"]])
+    assert not _check(Union[List[List[int]], List[List[str]]], [[1, "a"]])
+    assert _check(Dict[str, List[int]], {"a": [1]}) and not _check(Dict[str, List[int]], {"a": [1, "b"]})
+    assert _check(Tuple[List[int], Set[str]], ([1], {"a"})) and not _check(Tuple[List[int], Set[str]], ([1], {1}))
+
+    # a shared row is checked once
+    checked = []
+
+    class _Counted(type):
+        def __instancecheck__(cls, instance):
+            checked.append(instance)
+            return True
+
+    class _Value(metaclass=_Counted):
+        pass
+
+    class _SubValue(_Value):
+        pass
+
+    row = [_SubValue()]
+    assert _check(List[List[_Value]], [row] * 100)
+    assert len(checked) <= 1
+    assert _check(List[List[List[_Value]]], [[row, [_SubValue()]]] * 100)
+    assert len(checked) <= 3
+
+
+def test_type_cached():
+    """
+    test type verdict cache
+    """
+
+    class _Abstract(metaclass=abc.ABCMeta):
+        pass
+
+    class _Registered(object):
+        pass
+
+    for val in [None, [], _Registered(), b""]:
+        # these should fail
+        try:
+            print(val)
+            TypeChecker[int, float, str, _Abstract](val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    _Abstract.register(_Registered)
+    print()
+    for val in [0, 1.0, "", True, _Registered()]:
+        print(val)
+        TypeChecker[int, float, str, _Abstract](val)
+
+    type_check = TypeChecker._compile(Union[int, Set], True)
+    for val in range(runtime_check.check_type._TYPE_CACHE_SIZE + 10):
+        assert not type_check(type("_Class{}".format(val), (object,), {})())
+    assert type_check(1)
+
+
+def test_type_streaming():
+    """
+    test type streaming of iterators and generators
+    """
+
+    @check_type_at_run
+    def _check_iterator(val_a: Iterator[int]) -> Iterable[str]:
+        return (str(val) if val < 10 else val for val in val_a)
+
+    @check_type_at_run
+    def _check_generator(val_a: int) -> Generator[int, str, float]:
+        total = 0
+        while total < val_a:
+            total += len((yield total))
+        return float(total) if val_a > 0 else None
+
+    for val in [[1, 2], iter([1, ""]), iter([1, 20])]:
+        # these should fail
+        try:
+            print(val)
+            list(_check_iterator(val))
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    print()
+    for val in [iter([]), iter([1, 2, 3])]:
+        print(val)
+        assert all(isinstance(elem, str) for elem in _check_iterator(val))
+
+    consumed = iter([1, 2, ""])
+    checked = _check_iterator(consumed)
+    assert next(checked) == "1" and next(consumed) == 2
+
+    generator = _check_generator(3)
+    assert next(generator) == 0 and generator.send("ab") == 2
+    try:
+        generator.send(1)
+        raise EnvironmentError("Error: {} should not be valid".format(1))
+    except TypeError:
+        pass
+    try:
+        generator.send("a")
+        raise EnvironmentError("Error: generator should be done")
+    except StopIteration as stop:
+        assert stop.value == 3.0
+
+    # the generator is started by sending None, that is not a value sent to the generator
+    generator = _check_generator(5)
+    assert generator.send(None) == 0 and generator.send("abc") == 3
+    try:
+        generator.send(None)
+        raise EnvironmentError("Error: {} should not be valid".format(None))
+    except TypeError:
+        pass
+
+    generator = _check_generator(0)
+    try:
+        next(generator)
+        raise EnvironmentError("Error: {} should not be valid".format(None))
+    except TypeError:
+        pass
+
+    TypeChecker[Iterable[int]]([1, 2])
+    TypeChecker[Iterable[int]](iter([1, ""]))
+    try:
+        TypeChecker[Iterable[int]]([1, ""])
+        raise EnvironmentError("Error: {} should not be valid".format([1, ""]))
+    except TypeError:
+        pass
+
+
+def test_type_async():
+    """
+    test type decorator on coroutine and async generator functions
+    """
+
+    @check_type_at_run
+    async def _check_coroutine(val_a: int) -> str:
+        await asyncio.sleep(0)
+        return "" if val_a >= 0 else val_a
+
+    assert inspect.iscoroutinefunction(_check_coroutine)
+    loop = asyncio.new_event_loop()
+    for val in ["", -1]:
+        # these should fail
+        try:
+            print(val)
+            loop.run_until_complete(_check_coroutine(val))
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+    loop.run_until_complete(_check_coroutine(1))
+
+    if not hasattr(inspect, "isasyncgenfunction"):  # python 3.5
+        loop.close()
+        return
+
+    namespace = {}
+    exec("async def _check_async_generator(val_a: int) -> AsyncGenerator[int, str]:\n" +
+         "    for val in range(val_a):\n" +
+         "        sent = yield val if val < 3 else str(val)\n" +
+         "        if sent is not None:\n" +
+         "            yield len(sent)\n", {"AsyncGenerator": typing.AsyncGenerator}, namespace)
+    _check_async_generator = check_type_at_run(namespace["_check_async_generator"])
+    assert inspect.isasyncgenfunction(_check_async_generator)
+
+    async def _consume(val_a, sent=None):
+        generator = _check_async_generator(val_a)
+        values = [await generator.__anext__()]
+        if sent is not None:
+            values.append(await generator.asend(sent))
+        async for val in generator:
+            values.append(val)
+        return values
+
+    for val in [("",), (4,), (2, 1)]:
+        # these should fail
+        try:
+            print(val)
+            loop.run_until_complete(_consume(*val))
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    assert loop.run_until_complete(_consume(3)) == [0, 1, 2]
+    assert loop.run_until_complete(_consume(2, "abc")) == [0, 3, 1]
+    loop.close()
+
+
+def test_typed_containers():
+    """
+    test typed containers
+    """
+    probabilities = TypedList[float, (0, 1)]([0.5])
+    probabilities.append(0.25)
+    probabilities += [0.0]
+    probabilities[0:1] = [1.0, 0.75]
+    assert probabilities == [1.0, 0.75, 0.25, 0.0]
+    assert TypedList[float, (0, 1)] is type(probabilities)
+    assert pickle.loads(pickle.dumps(probabilities)) == probabilities
+
+    counts = TypedDict[str, int](a=1)
+    counts.update({"b": 2})
+    counts["c"] = 3
+    assert counts.copy() == {"a": 1, "b": 2, "c": 3}
+
+    labels = TypedSet[int]({1})
+    labels.add(2)
+    labels |= {3}
+    assert labels == {1, 2, 3}
+
+    for mutate in [lambda: probabilities.append(""), lambda: probabilities.append(2.0),
+                   lambda: probabilities.extend([0.5, ""]), lambda: probabilities.insert(0, 2.0),
+                   lambda: probabilities.__setitem__(slice(0, 1), [-1.0]), lambda: counts.update(d=""),
+                   lambda: counts.__setitem__(1, 1), lambda: counts.setdefault("e", ""),
+                   lambda: labels.add(""), lambda: labels.update([4], [""]), lambda: TypedList([1])]:
+        try:
+            mutate()
+            raise EnvironmentError("Error: {} should not be valid".format(mutate))
+        except (TypeError, ValueError):
+            pass
+    assert probabilities == [1.0, 0.75, 0.25, 0.0]
+    assert counts == {"a": 1, "b": 2, "c": 3}
+    assert labels == {1, 2, 3}
+
+    # the deep check does not visit the elements of a container that guarantees them
+    elements = TypedList[int]([1])
+    list.append(elements, "")
+    assert TypeChecker._compile(List[int], True)(elements)
+    assert TypeChecker._compile(List[Union[int, str]], True)(elements)
+    assert TypeChecker._compile(Dict[str, Any], True)(counts)
+    assert not TypeChecker._compile(List[str], True)(elements)
+    assert not TypeChecker._compile(Set[str], True)(labels)
+
+    # the elements that can change once added are visited
+    rows = TypedList[List[int]]([[1]])
+    rows[0].append("")
+    assert not TypeChecker._compile(List[List[int]], True)(rows)
+    pairs = TypedList[Tuple[int, str]]([(1, "a")])
+    list.append(pairs, "")
+    assert TypeChecker._compile(List[Tuple[int, str]], True)(pairs)
+
+    # the subclasses of the typed containers are specialized as themselves
+    class _Stack(TypedList):
+        __slots__ = ()
+
+    assert issubclass(_Stack[int], _Stack) and _Stack[int] is not TypedList[int]
+    assert not issubclass(TypedList[str], _Stack)
+
+    @check_type_at_run
+    def _sum(val_a: List[float], val_b: Dict[str, int], val_c: Set[int]):
+        return sum(val_a)
+
+    _sum(probabilities, counts, labels)
+
+
+def test_class_decorator():
+    """
+    test class decorator
+    """
+
+    # the class annotations are set explicitly, as the variable annotations need python 3.6
+    @check_class_at_run
+    class _Record(object):
+        __annotations__ = {'name': str, 'score': (0, 1), 'tags': List[str], 'count': typing.ClassVar[int]}
+        tags = []
+        count = 0
+
+        def __init__(self, name, score):
+            self.name = name
+            self.score = score
+
+        def rename(self, name: str) -> (0, 1):
+            self.name = name
+            return self.score
+
+        @staticmethod
+        def create(name: str):
+            return _Record(name, 0.5)
+
+    @check_class_at_run(slots=True)
+    class _Point(object):
+        __annotations__ = {'x': float, 'y': float}
+        y = 0.0
+
+        def __init__(self, x):
+            self.x = x
+
+    record = _Record.create("a")
+    record.tags = ["b"]
+    _Record.count = 1
+    assert record.rename("c") == 0.5 and record.name == "c"
+    point = _Point(1.0)
+    point.y = 2.0
+    assert (point.x, point.y, _Point(0.0).y) == (1.0, 2.0, 0.0)
+    assert not hasattr(point, '__dict__')
+
+    for assign in [lambda: setattr(record, 'name', 1), lambda: setattr(record, 'score', 2),
+                   lambda: setattr(record, 'tags', [1]), lambda: record.rename(1), lambda: _Record(1, 0.5),
+                   lambda: _Record.create(None), lambda: setattr(point, 'x', ""), lambda: _Point("")]:
+        try:
+            assign()
+            raise EnvironmentError("Error: {} should not be valid".format(assign))
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        point.z = 0
+        raise EnvironmentError("Error: {} should not have a __dict__".format(point))
+    except AttributeError:
+        pass
+
+    # the forward references are resolved, the ones that cannot be resolved are not checked
+    @check_class_at_run
+    class _Node(object):
+        __annotations__ = {'parent': Optional['_Node'], 'label': 'str'}
+
+        def link(self, other: '_Node') -> '_Undefined':
+            self.parent = other
+
+    node = _Node()
+    node.label = "a"
+    node.link(_Node())
+    for assign in [lambda: setattr(node, 'label', 1), lambda: node.link(1)]:
+        try:
+            assign()
+            raise EnvironmentError("Error: {} should not be valid".format(assign))
+        except TypeError:
+            pass
+
+    class _Base(object):
+        __slots__ = ()
+
+        def norm(self):
+            return 1.0
+
+    def _slotted():
+        @check_class_at_run(slots=True)
+        class _Vector(_Base):
+            __annotations__ = {'x': float}
+
+            def norm(self):
+                return super().norm() + 1.0
+        return _Vector
+
+    if sys.version_info < (3, 7):
+        try:
+            _slotted()
+            raise EnvironmentError("Error: super() should not be valid with slots")
+        except TypeError:
+            pass
+    else:
+        assert _slotted()().norm() == 2.0
+
+
+def test_validate_many():
+    """
+    test batch validation
+    """
+    result = TypeChecker.validate_many(Dict[str, int], [{"a": 1}, {"a": ""}, None, {}])
+    assert result.valid.tolist() == [True, False, False, True]
+    assert result.failures.tolist() == [1, 2] and result.count == 2
+    assert TypeChecker.validate_many((int, str), (val for val in [1, "", 1.0])).failures.tolist() == [2]
+    assert TypeChecker.validate_many(numpy.float64, numpy.zeros(3)).count == 0
+    assert TypeChecker.validate_many(ArraySpec[numpy.float64, (2,)], numpy.zeros((3, 2))).count == 0
+    assert TypeChecker.validate_many(int, numpy.array([1, ""], dtype=object)).failures.tolist() == [1]
+    result = TypeChecker.validate_many(int, numpy.array(1.0))
+    assert result.valid.shape == () and result.failures.tolist() == [0] and result.count == 1
+    assert TypeChecker.validate_many(float, numpy.array(1.0, dtype=object)).count == 0
+
+    assert BoundChecker.validate_many((0, 1), [0.5, 2, "", -1]).failures.tolist() == [1, 2, 3]
+    assert BoundChecker.validate_many([(0, 1), (2, 3)], range(5)).failures.tolist() == [4]
+    assert BoundChecker.validate_many((0, 1), [0.5, [1, 2], (1,), 2]).failures.tolist() == [1, 2, 3]
+    result = BoundChecker.validate_many((0, 1), numpy.array([[0.5, 2.0], [0.0, -1.0]]))
+    assert result.valid.shape == (2, 2) and result.failures.tolist() == [1, 3] and result.count == 2
+
+    with runtime_check.checking(enabled=False):
+        assert TypeChecker.validate_many(int, [""]).count == 0
+        assert BoundChecker.validate_many((0, 1), [2]).count == 0
+
+
+def test_lazy_numpy():
+    """
+    test numpy is only imported when arrays are used, and concurrent.futures when checks are run in parallel
+    """
+    code = "\n".join([
+        "import sys, typing, runtime_check",
+        "runtime_check.TypeChecker[typing.List[int]]([1])",
+        "runtime_check.BoundChecker.positive(1)",
+        "runtime_check.check_bound_at_run(lambda val: val)(1)",
+        "runtime_check.TypedList[float, (0, 1)]([0.5])",
+        "assert 'numpy' not in sys.modules and 'concurrent.futures' not in sys.modules",
+        "runtime_check.ArraySpec[float]",
+        "assert 'numpy' in sys.modules"])
+    subprocess.check_call([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_type_array_spec():
+    """
+    test type array spec
+    """
+
+    @check_type_at_run
+    def _check_spec(val_a: ArraySpec[numpy.float32, ("N", 3)], val_b: Optional[ArraySpec[numpy.floating, ("N",)]]
+                    = None) -> ArraySpec[None, ("N", "N"), 'C']:
+        return numpy.zeros((val_a.shape[0], val_a.shape[0] + int(val_b is not None and val_b[0] == 1)))
+
+    for val in [(numpy.zeros((2, 3)),), (numpy.zeros((2, 3), dtype=numpy.float32), numpy.zeros(3)),
+                (numpy.zeros((2, 4), dtype=numpy.float32),), (numpy.zeros(3, dtype=numpy.float32),),
+                (numpy.zeros((2, 3), dtype=numpy.float32), numpy.zeros(2, dtype=numpy.int64)),
+                (numpy.zeros((2, 3), dtype=numpy.float32), numpy.ones(2)), ([[0, 0, 0]],)]:
+        # these should fail
+        try:
+            print(val)
+            _check_spec(*val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    print()
+    for val in [(numpy.zeros((2, 3), dtype=numpy.float32),), (numpy.zeros((0, 3), dtype=numpy.float32), None),
+                (numpy.zeros((5, 3), dtype=numpy.float32), numpy.zeros(5, dtype=numpy.float16))]:
+        print(val)
+        _check_spec(*val)
+
+    TypeChecker[ArraySpec[int, ("N", "N")]](numpy.zeros((2, 2), dtype=int))
+    for val in [numpy.zeros((2, 3), dtype=int), numpy.zeros((2, 2), dtype=int).T[:, :1]]:
+        try:
+            TypeChecker[ArraySpec[int, ("N", "N"), 'F']](val)
+            raise EnvironmentError("Error: {} should not be valid".format(val))
+        except TypeError:
+            pass
+
+    for spec in [(int, [2]), (int, (-1,)), (int, None, 'A')]:
+        try:
+            print(ArraySpec[spec])
+            raise EnvironmentError("Error: {} should not be valid".format(spec))
+        except ValueError:
+            pass
+
+
+def test_profiling():
+    """
+    test profiling of the decorated functions
+    """
+
+    runtime_check.profiling.PROFILE = True
+    try:
+        @check_type_at_run
+        def _profiled(val_a: int) -> int:
+            return val_a
+
+        @check_bound_at_run
+        def _profiled_bounds(val_a) -> (0, 1):
+            return val_a
+    finally:
+        runtime_check.profiling.PROFILE = False
+
+    for val in [0, 1, 2]:
+        _profiled(val)
+    for val in ["", 0.5]:
+        try:
+            _profiled(val)
+        except TypeError:
+            pass
+    for val in [0.5, 2]:
+        try:
+            _profiled_bounds(val)
+        except ValueError:
+            pass
+
+    summaries = {summary['name'].split('.')[-1]: summary for summary in runtime_check.stats()}
+    assert summaries['_profiled']['calls'] == 3 and summaries['_profiled']['pre_failures'] == 2
+    assert summaries['_profiled_bounds']['calls'] == 1 and summaries['_profiled_bounds']['post_failures'] == 1
+    assert summaries['_profiled']['pre']['p99_ns'] >= summaries['_profiled']['pre']['p50_ns'] >= 0
+    assert "_profiled_bounds" in runtime_check.stats_table()
+    assert json.loads(runtime_check.stats_json(sort_by='calls'))[0]['calls'] == 3
+
+    runtime_check.reset_stats()
+    assert all(summary['calls'] == 0 for summary in runtime_check.stats())
+
+
+def test_call_sampling():
+    """
+    test sampling of the checked calls
+    """
+    checked = []
+
+    def _counted(val):
+        checked.append(val)
+        if val < 0:
+            raise ValueError("Error: {} is negative".format(val))
+
+    @enforce_annotations(rate=0.1)
+    def _sampled(val_a: _counted):
+        return val_a
+
+    for val in range(10000):
+        assert _sampled(val) == val
+    assert 700 < len(checked) < 1300
+
+    # the calls following a failure are all checked
+    failed = False
+    for _ in range(1000):
+        try:
+            _sampled(-1)
+        except ValueError:
+            failed = True
+            break
+    assert failed
+    del checked[:]
+    for val in range(runtime_check.call_sampling.RECOVERY_CALLS):
+        _sampled(val)
+    assert len(checked) == runtime_check.call_sampling.RECOVERY_CALLS
+
+    @check_type_at_run(max_overhead=0.01)
+    def _adapted(val_a: List[int]):
+        return len(val_a)
+
+    @check_bound_at_run(max_overhead=0.5)
+    def _slow(val_a: (0, 1)):
+        return sum(range(10000)) * val_a
+
+    runtime_check.check_type.DEEP = True
+    values = list(range(10000))
+    for _ in range(100):
+        _adapted(values)
+        _slow(0.5)
+    assert _adapted.call_sampler.rate < 0.5
+    assert _slow.call_sampler.rate == 1.0
+
+    for rate, max_overhead in [(0, None), (1.5, None), (None, 0), (None, 1)]:
+        try:
+            check_type_at_run(rate=rate, max_overhead=max_overhead)(_sampled)
+            raise EnvironmentError("Error: {} should not be valid".format((rate, max_overhead)))
+        except ValueError:
+            pass
+
+
+def test_parallel():
+    """
+    test parallel checks of large containers and arrays
+    """
+
+    class _Local(object):
+        pass
+
+    runtime_check.parallel.PARALLEL = Parallel(workers=2, threshold=100)
+    try:
+        for key, val in [(List[int], list(range(1000))), (Set[str], set(map(str, range(1000)))),
+                         (Tuple[float, ...], (0.5,) * 1000), (Dict[str, List[Optional[int]]],
+                                                              {str(i): [i, None] for i in range(1000)}),
+                         (List[_Local], [_Local()] * 1000), (List[int], list(range(10)))]:
+            TypeChecker[key](val)
+
+        for key, val in [(List[int], list(range(1000)) + [""]), (Set[str], set(range(1000))),
+                         (Set[int], list(range(1000))), (Dict[str, int], dict({str(i): i for i in range(1000)}, a="")),
+                         (List[int], [lambda: 0] * 1000)]:
+            try:
+                TypeChecker[key](val)
+                raise EnvironmentError("Error: {} should not be valid".format(key))
+            except TypeError:
+                pass
+
+        values = numpy.linspace(0, 1, 3000).reshape(1000, 3)
+        BoundChecker[(0, 1)](values)
+        values[800, 1] = 2
+        try:
+            BoundChecker[(0, 1)](values)
+            raise EnvironmentError("Error: the array should not be valid")
+        except ValueError as error:
+            assert "at index (800, 1)" in str(error)
+        assert list(BoundChecker.validate_many((0, 1), values).failures) == [2401]
+    finally:
+        runtime_check.parallel.PARALLEL = None
+
+
+def test_schema():
+    """
+    test columnar schema of structured arrays and dicts of arrays
+    """
+    schema = Schema({'id': numpy.integer, 'score': (numpy.float64, (0, 1)), 'age': (None, [(0, 150)])})
+    batch = numpy.zeros(5, dtype=[('id', numpy.int64), ('score', numpy.float64), ('age', numpy.int32),
+                                  ('name', 'U10')])
+    batch['score'] = [0.1, 0.5, 2.0, 0.3, -1.0]
+    batch['age'] = [10, 200, 30, 40, 50]
+
+    for table in [batch, batch.view(numpy.recarray), {name: batch[name] for name in batch.dtype.names}]:
+        result = schema.validate(table)
+        assert list(result.valid) == [True, False, False, True, False] and result.count == 3
+        assert list(result.failures) == [1, 2, 4] and not result.errors
+        assert list(result.columns['score']) == [2, 4] and list(result.columns['age']) == [1]
+        try:
+            schema(table)
+            raise EnvironmentError("Error: the batch should not be valid")
+        except ValueError as error:
+            assert "2.0 at row 2 for column score" in str(error)
+
+    valid = batch[batch['score'] >= 0][:1]
+    schema(valid)
+    Schema([('id', None)])({'id': numpy.arange(3), 'other': [1, 2]})
+
+    @enforce_annotations
+    def _load(table: schema):
+        return table
+    _load(valid)
+
+    for table, column in [({'id': numpy.arange(3), 'score': numpy.zeros(3)}, 'age'),
+                          ({'id': numpy.zeros(3), 'score': numpy.zeros(3), 'age': numpy.zeros(3)}, 'id'),
+                          ({'id': numpy.arange(3), 'score': numpy.zeros(2), 'age': numpy.zeros(3)}, 'score'),
+                          ({'id': numpy.arange(3), 'score': numpy.zeros(3), 'age': numpy.array(["a"] * 3)}, 'age'),
+                          ({'id': [1, 2, 3], 'score': numpy.zeros(3), 'age': numpy.zeros(3)}, 'id')]:
+        result = schema.validate(table)
+        assert list(result.errors) == [column] and result.count == 3, result
+        try:
+            schema(table)
+            raise EnvironmentError("Error: {} should not be valid".format(table))
+        except TypeError as error:
+            assert "column " + column in str(error)
+
+    for table in [numpy.zeros(3), [1, 2], batch.reshape(5, 1)]:
+        try:
+            schema.validate(table)
+            raise EnvironmentError("Error: {} should not be valid".format(table))
+        except TypeError:
+            pass
+
+    with runtime_check.checking(enabled=False):
+        schema(batch)
+        assert schema.validate(batch).count == 0
+
+
+def test_validated():
+    """
+    test registry of the validated immutable values
+    """
+    checked = []
+
+    class _Counted(type):
+        def __instancecheck__(cls, instance):
+            checked.append(instance)
+            return True
+
+    class _Value(metaclass=_Counted):
+        pass
+
+    class _SubValue(_Value):
+        pass
+
+    @check_type_at_run
+    def _repository(rows: Tuple[_Value, ...]) -> Tuple[_Value, ...]:
+        return rows
+
+    @check_type_at_run
+    def _service(rows: Tuple[_Value, ...]):
+        return _repository(rows)
+
+    @check_bound_at_run
+    def _scale(values: (0, 1)):
+        return values
+
+    rows = tuple(_SubValue() for _ in range(10))
+    runtime_check.validated.REMEMBER = True
+    try:
+        _service(rows)
+        _service(rows)
+        assert len(checked) == 10
+
+        # the mutable values are checked every time
+        del checked[:]
+        mutable = tuple(_SubValue() for _ in range(4)) + ([],) * 4
+        _service(mutable)
+        _service(mutable)
+        assert len(checked) == 2 * 3 * 8 and len(runtime_check.validated._VALIDATED) == 1
+
+        # a read-only array that owns its data can be changed in between
+        values = numpy.arange(100) / 100
+        values.flags.writeable = False
+        _scale(values)
+        _scale(values[10:])
+        assert len(runtime_check.validated._VALIDATED) == 1
+        values.flags.writeable = True
+        values[0] = 2
+        values.flags.writeable = False
+        try:
+            _scale(values)
+            raise EnvironmentError("Error: the changed array should not be valid")
+        except ValueError:
+            pass
+
+        frozen = numpy.frombuffer((numpy.arange(100) / 100).tobytes())
+        _scale(frozen)
+        _scale(frozen)
+        _scale(frozen[10:])
+        assert len(runtime_check.validated._VALIDATED) == 3
+
+        runtime_check.validated.CACHE_SIZE = 4
+        for _ in range(10):
+            _service(tuple(_SubValue() for _ in range(10)))
+        assert len(runtime_check.validated._VALIDATED) <= 4
+    finally:
+        runtime_check.validated.REMEMBER = False
+        runtime_check.validated.CACHE_SIZE = 1024
+        runtime_check.validated.clear()
+
+
+def test_protocol():
+    """
+    test structural checks of protocols and user generics
+    """
+    from typing_extensions import Protocol
+    T = TypeVar('T')
+
+    class _Closer(Protocol):
+        def close(self):
+            pass
+
+    class _Reader(Protocol[T]):
+        def read(self) -> T:
+            pass
+
+    class _Box(typing.Generic[T]):
+        pass
+
+    class _File(object):
+        def __init__(self):
+            self.read = lambda: 0
+
+        def close(self):
+            pass
+
+    class _Closed(_File):
+        close = None
+
+    class _Plugin(object):
+        pass
+
+    @check_type_at_run
+    def _use(plugin: _Closer, reader: Optional[_Reader[int]] = None, box: Optional[_Box[int]] = None):
+        return plugin
+
+    _use(_File(), _File(), _Box())
+    for plugin in [_Closed(), _Plugin(), None]:
+        try:
+            _use(plugin)
+            raise EnvironmentError("Error: {} should not be a closer".format(plugin))
+        except TypeError:
+            pass
+    try:
+        _use(_File(), _Plugin())
+        raise EnvironmentError("Error: a plugin should not be a reader")
+    except TypeError:
+        pass
+    try:
+        _use(_File(), box=[])
+        raise EnvironmentError("Error: a list should not be a box")
+    except TypeError:
+        pass
+    assert TypeChecker._checker(List[_Closer], deep=True)([_File(), _File()])
+
+    # the verdict is cached per class: an added member is found, a removed member once the class is invalidated
+    _Plugin.close = lambda self: None
+    _use(_Plugin())
+    _Patched = type('_Patched', (object,), {'close': lambda self: None})
+    _use(_Patched())
+    del _Patched.close
+    _use(_Patched())
+    TypeChecker.invalidate(_Patched)
+    try:
+        _use(_Patched())
+        raise EnvironmentError("Error: the changed plugin should not be a closer")
+    except TypeError:
+        pass
+
+
+def test_generic_forms():
+    """
+    test typing generics, which are aliases of their class since python 3.7
+    """
+    T = TypeVar('T')
+
+    class _Box(typing.Generic[T]):
+        pass
+
+    runtime_check.check_type.DEEP = True
+    try:
+        for key, val in [(List[int], ['a']), (Dict[str, int], {'a': 'b'}), (Set[int], {'a'}),
+                         (Tuple[int, str], (1, 2)), (Tuple[int, ...], (1, 'a')), (Optional[List[int]], ['a']),
+                         (_Box[int], [])]:
+            try:
+                TypeChecker[key](val)
+                raise EnvironmentError("Error: {} should not be valid for {}".format(val, key))
+            except TypeError:
+                pass
+        TypeChecker[List[int]]([1])
+        TypeChecker[Optional[Dict[str, List[int]]]]({'a': [1]})
+        TypeChecker[_Box[int]](_Box())
+        assert TypeChecker._streamer(Iterator[int], 'return') is not None
+    finally:
+        runtime_check.check_type.DEEP = False
+    TypeChecker.invalidate()
+
+
+def test_abstract_generics():
+    """
+    test deep checks of the collections.abc generics, and shallow checks of those whose elements are not inspected
+    """
+    @check_type_at_run(deep=True)
+    def _deep(a: typing.Sequence[int] = (), b: typing.AbstractSet[str] = frozenset(),
+              c: typing.Mapping[str, int] = None):
+        return a
+
+    @check_type_at_run(deep=False)
+    def _shallow(a: typing.Sequence[int]):
+        return a
+
+    async def _coroutine():
+        return 'a'
+
+    _deep([1, 2], {'a'}, {'a': 1})
+    _deep((1, 2), b=frozenset(['a']))
+    _deep(range(3))
+    for args in [([1, 'a'],), ('',), (b'', {1}), ([], set(), {'a': 'b'}), ([], set(), {1: 1})]:
+        try:
+            _deep(*args)
+            raise EnvironmentError("Error: {} should not be valid".format(args))
+        except TypeError:
+            pass
+    _shallow([1, 'a'])
+    try:
+        _shallow({1})
+        raise EnvironmentError("Error: a set should not be a sequence")
+    except TypeError:
+        pass
+
+    # the elements of awaitables and async iterators cannot be inspected, only their class is checked
+    coroutine = _coroutine()
+    TypeChecker[typing.Awaitable[int]](coroutine)
+    coroutine.close()
+    try:
+        TypeChecker[typing.Awaitable[int]](1)
+        raise EnvironmentError("Error: an int should not be awaitable")
+    except TypeError:
+        pass
+
+
+def test_violations():
+    """
+    test reporting of the failed checks to a handler
+    """
+    formatted = []
+
+    class _Described(type):
+        def __str__(cls):
+            formatted.append(cls)
+            return cls.__name__
+
+    class _Token(metaclass=_Described):
+        pass
+
+    @check_type_at_run
+    def _type(a: _Token):
+        return a
+
+    @check_bound_at_run
+    def _bound(a: (0, 1)) -> (0, 1):
+        return a
+
+    @enforce_annotations
+    def _enforced(a: [TypeChecker[int], BoundChecker[(0, 10)]]):
+        return a
+
+    @check_class_at_run
+    class _Record(object):
+        score: (0, 1)
+
+    @check_type_at_run(rate=0.01)
+    def _sampled(val_a: int):
+        return val_a
+
+    runtime_check.profiling.PROFILE = True
+    try:
+        @check_type_at_run
+        def _profiled(val_a: int):
+            return val_a
+    finally:
+        runtime_check.profiling.PROFILE = False
+
+    reports = []
+    runtime_check.violations.HANDLER = reports.append
+    runtime_check.violations.INTERVAL = 3600
+    try:
+        for _ in range(100):
+            assert _type(1) == 1
+        assert len(reports) == 1 and reports[0].count == 1 and reports[0].sample == 1 and not formatted
+        assert reports[0].error is TypeError and "Expected _Token for argument a" in reports[0].message
+        del reports[:]
+
+        # the failures are counted between the reports
+        runtime_check.violations.flush()
+        assert len(reports) == 1 and reports[0].count == 99 and reports[0].total == 100
+        runtime_check.violations.flush()
+        assert len(reports) == 1
+
+        del reports[:]
+        assert (_bound(numpy.array([0.5, 3.0])) == [0.5, 3.0]).all()
+        assert _bound(2) == 2
+        assert _enforced(20.0) == 20.0
+        _Record().score = 2
+        assert [report.error for report in reports] == [ValueError] * 2 + [TypeError, ValueError, ValueError]
+        assert "3.0 at index 1 for argument a" in reports[0].message
+
+        # the validators made again for the same key share their site
+        del reports[:]
+        for _ in range(100):
+            TypeChecker[bytes]('a')
+            BoundChecker.positive(-1)
+        assert [report.error for report in reports] == [TypeError, ValueError]
+
+        # the values that cannot be compared, and the array specs, are reported too
+        del reports[:]
+        assert _bound('a') == 'a'
+        BoundChecker[(0, 1)]('a')
+        ArraySpec[numpy.float64, (None,)](numpy.zeros(2, dtype=int))
+        assert [report.error for report in reports] == [TypeError] * 4  # the argument and the return of _bound
+        assert "float64" in reports[3].message
+
+        # the invalid bound specs still raise, and are not cached
+        del reports[:]
+        for spec in [(0, 1, (1, True)), ("a", 1), [(0, None)]]:
+            for _ in range(2):
+                try:
+                    BoundChecker[spec]
+                    raise EnvironmentError("Error: {} should not be a valid spec".format(spec))
+                except TypeError:
+                    pass
+        try:
+            @check_bound_at_run
+            def _bad(val_a: (0, "1")):
+                return val_a
+            raise EnvironmentError("Error: {} should not be a valid spec".format((0, "1")))
+        except TypeError:
+            pass
+        assert not reports
+
+        # the reported failures are seen by the call sampler and the profiler, as the raised ones
+        for _ in range(1000):
+            assert _sampled("") == ""
+        assert _sampled.call_sampler.recovery > 0
+        _profiled("")
+        summary = [summary for summary in runtime_check.stats()
+                   if summary['name'].endswith('test_violations.<locals>._profiled')][0]
+        assert summary['pre_failures'] == 1
+    finally:
+        runtime_check.violations.HANDLER = None
+        runtime_check.violations.INTERVAL = 10.0
+
+    try:
+        _type(1)
+        raise EnvironmentError("Error: the check should raise without a handler")
+    except TypeError:
+        pass